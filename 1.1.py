@@ -14,7 +14,7 @@ OUTPUT_FOLDER = "filtered_output"   # Filtered outputs as .gz (same basenames)
 SUMMARY_FILE = "summary_report.txt" # Saved in current working dir
 RESUME_LOG   = "resume_files.log"   # Checkpoint log in current working dir
 MAX_WORKERS  = 6                    # Use 6–8 for optimal performance
-GZIP_LEVEL   = 6                    # Compression level for outputs
+GZIP_LEVEL   = 1                    # Compression level for outputs (1 = fastest; intermediate data)
 # =========================== #
 
 # ---- Main pattern: header (>=5 bracketed fields) + optional '-' + "<### Request URI/URL:" + [CustomerId:...]
@@ -21,17 +21,21 @@ ALLOWED_EXTS = (".txt",)            # Process only .txt files
 
 CASE_SENSITIVE = True               # Key matches respect case
 EMIT_SINGLE_SPACE = True            # Normalize join spacing around kept items
+ETA_REFRESH_SECS = 0.5              # Min seconds between progress-bar ETA refreshes
+WRITE_BUFFER = 1 << 20              # Output is flushed in blocks of this size (bytes)
 # =========================== #
 
 MOBILE_REGEX = re.compile(r'(?<![A-Za-z0-9])(?:91)?[6-9]\d{9}(?![A-Za-z0-9])')
+PREAMBLE_RE  = re.compile(r'^\s*((?:\[[^\]]*\]\s*)+)(.*)$')
+BRACKET_RE   = re.compile(r'\[[^\]]*\]')
 
 def extract_tokens_and_body(line: str):
     """Split line into tokens (leading brackets) and the rest (body+path)."""
-    m = re.match(r'^\s*((?:\[[^\]]*\]\s*)+)(.*)$', line)
+    m = PREAMBLE_RE.match(line)
     if not m:
         return [], line
     preamble, body = m.groups()
-    tokens = re.findall(r'\[[^\]]*\]', preamble)
+    tokens = BRACKET_RE.findall(preamble)
     return tokens, body
 
 def process_case(line: str, expected_brackets: int, key_name: str, case_id: str):
@@ -120,12 +124,16 @@ def process_file(file_path: str):
         "output_lines": 0,
     }
     out_path = os.path.join(OUTPUT_FOLDER, os.path.basename(file_path))
+    out_buf = bytearray()
 
     try:
         with open(file_path, "r", encoding="utf-8", errors="ignore") as f_in, \
-             open(out_path, "w", encoding="utf-8") as f_out:
+             open(out_path, "wb") as f_out:
             for raw in f_in:
                 local["lines_processed"] += 1
+                if len(out_buf) >= WRITE_BUFFER:
+                    f_out.write(out_buf)
+                    out_buf.clear()
                 new_line, status = process_line(raw.strip("\n"))
 
                 if status.startswith("case"):
@@ -140,11 +148,15 @@ def process_file(file_path: str):
                     if new_line != raw.strip():
                         local["lines_modified"] += 1
                     local["output_lines"] += 1
-                    f_out.write(new_line + "\n")
+                    out_buf += new_line.encode("utf-8")
+                    out_buf += b"\n"
 
                 if status == "unchanged":
                     local["unchanged"] += 1
 
+            if out_buf:
+                f_out.write(out_buf)
+
     except Exception as e:
         try:
             if os.path.exists(out_path):
@@ -213,11 +225,11 @@ def main():
         sys.exit(1)
 
     os.makedirs(OUTPUT_FOLDER, exist_ok=True)
-    all_files = sorted(
-        os.path.join(INPUT_FOLDER, f)
-        for f in os.listdir(INPUT_FOLDER)
-        if os.path.isfile(os.path.join(INPUT_FOLDER, f)) and os.path.splitext(f)[1].lower() in ALLOWED_EXTS
-    )
+    with os.scandir(INPUT_FOLDER) as it:
+        all_files = sorted(
+            e.path for e in it
+            if e.is_file() and e.name.lower().endswith(ALLOWED_EXTS)
+        )
     if not all_files:
         print(f"No {ALLOWED_EXTS} files found in INPUT_FOLDER.", file=sys.stderr)
         return
@@ -249,6 +261,8 @@ def main():
     }
 
     overall_bar = tqdm(total=len(pending_files), desc="Overall", unit="file", leave=True)
+    start_ts = time.time()
+    last_eta_update = 0.0
     try:
         with ProcessPoolExecutor(max_workers=MAX_WORKERS) as ex:
             futures = {ex.submit(process_file, fp): fp for fp in pending_files}
@@ -278,11 +292,16 @@ def main():
                     summary["files_error"] += 1
                     summary["errors"].append(f"{base_name}: worker exception: {e}")
                 overall_bar.update(1)
-                elapsed = time.time() - summary["files_scanned"]
-                avg = elapsed / max(1, summary["files_scanned"])
-                remaining = len(pending_files) - summary["files_scanned"]
-                eta = max(0, int(remaining * avg))
-                overall_bar.set_postfix_str(f"ETA: {str(timedelta(seconds=eta))}")
+
+                # ETA (throttled: every postfix re-renders the bar)
+                now = time.monotonic()
+                if now - last_eta_update >= ETA_REFRESH_SECS:
+                    last_eta_update = now
+                    elapsed = time.time() - start_ts
+                    avg = elapsed / max(1, summary["files_scanned"])
+                    remaining = len(pending_files) - summary["files_scanned"]
+                    eta = max(0, int(remaining * avg))
+                    overall_bar.set_postfix_str(f"ETA: {str(timedelta(seconds=eta))}")
     finally:
         overall_bar.close()
         write_summary(summary)
@@ -4,6 +4,9 @@
 import os
 import sys
 import re
+import glob
+import mmap
+import shutil
 from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
 from tqdm import tqdm
@@ -18,6 +21,8 @@ SUMMARY_FILE = "summary_extract.txt"     # Saved in current working dir
 RESUME_LOG = "resume_extract.log"        # Checkpoint log in current working dir
 MAX_WORKERS = 6                          # Parallelism
 ALLOWED_EXTS = (".txt",)                 # Process only .txt files
+FILES_PER_TASK = 32                      # Max files handed to a worker per submitted task
+WRITE_BUFFER = 1 << 20                   # Rewritten output is flushed in blocks of this size (bytes)
 
 # OPTIONAL: original (pre-clean) input folder from the 4-case run
 # If provided, we’ll compute Case 1–4 stats for comparison in the summary.
@@ -25,6 +30,7 @@ CASE_SOURCE_FOLDER = ""                  # e.g. "input_test" or absolute path; "
 # =========================== #
 
 FINAL_PATH = os.path.join(FINAL_FOLDER, FINAL_FILE)
+SHARD_GLOB = os.path.join(FINAL_FOLDER, "part-*.txt")  # per-batch bracket shards
 
 # ---------- tolerant helpers for CLEANED lines ----------
 # First bracket token + remainder
@@ -32,11 +38,15 @@ RE_HEAD = re.compile(r'^\s*(\[[^\]]*?\])\s*(.*)$')
 
 # Inside the bracket, extract key + digits (tolerant spacing)
 RE_KEYVAL = re.compile(r'^\[\s*(CustomerNo|Mobile-No)\s*:\s*([0-9]+)\s*\]\s*$')
+KEY_CUSTNO_B = b"CustomerNo"   # byte-level prefilter: a line without either
+KEY_MOBNO_B = b"Mobile-No"     # key name can never satisfy RE_KEYVAL
 
 # ---------- ORIGINAL (pre-clean) case classification (optional) ----------
 PREAMBLE_RE = re.compile(r'^\s*((?:\[[^\]]*\]\s*)+)(.*)$')
 BRACKET_RE  = re.compile(r'\[[^\]]*\]')
 MOBILE_REGEX = re.compile(r'(?<![A-Za-z0-9])(?:91)?[6-9]\d{9}(?![A-Za-z0-9])')
+CUSTNO_VAL_RE = re.compile(r'\[CustomerNo\s*:\s*([^\]]*)\]')
+MOBNO_VAL_RE  = re.compile(r'\[Mobile-No\s*:\s*([^\]]*)\]')
 
 def classify_case_from_original(line: str) -> str:
     m = PREAMBLE_RE.match(line)
@@ -63,8 +73,8 @@ def original_key_is_nonempty(line: str) -> bool:
     if not m:
         return False
     preamble = m.group(1)
-    m1 = re.search(r'\[CustomerNo\s*:\s*([^\]]*)\]', preamble)
-    m2 = re.search(r'\[Mobile-No\s*:\s*([^\]]*)\]', preamble)
+    m1 = CUSTNO_VAL_RE.search(preamble)
+    m2 = MOBNO_VAL_RE.search(preamble)
     val = (m1.group(1) if m1 else (m2.group(1) if m2 else None))
     return bool(val and val.strip())
 
@@ -82,12 +92,11 @@ def scan_case_source_folder(folder: str):
     results = {f"case{i}": {"no_mobile": 0, "with_mobile": 0} for i in range(1,5)}
     if not folder or not os.path.isdir(folder):
         return None
-    files = sorted(
-        os.path.join(folder, f)
-        for f in os.listdir(folder)
-        if os.path.isfile(os.path.join(folder, f))
-        and os.path.splitext(f)[1].lower() in ALLOWED_EXTS
-    )
+    with os.scandir(folder) as it:
+        files = sorted(
+            e.path for e in it
+            if e.is_file() and e.name.lower().endswith(ALLOWED_EXTS)
+        )
     for p in files:
         with open(p, "r", encoding="utf-8", errors="ignore") as fin:
             for raw in fin:
@@ -104,7 +113,39 @@ def scan_case_source_folder(folder: str):
     return results
 
 # ---------- extraction worker over CLEANED lines ----------
-def process_file(file_path: str):
+def _iter_raw_lines(f_in, file_path: str):
+    """
+    Yield each input line as valid UTF-8 bytes, without its trailing newline.
+    Splits an mmap of the file on b"\\n" directly; files containing '\\r' go
+    through text mode instead so universal-newline splitting stays as before.
+    Non-ASCII lines get the errors="ignore" decode text mode would apply.
+    """
+    if os.fstat(f_in.fileno()).st_size == 0:
+        return  # mmap refuses empty files
+    with mmap.mmap(f_in.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if mm.find(b"\r") != -1:
+            with open(file_path, "r", encoding="utf-8", errors="ignore") as f_txt:
+                for raw in f_txt:
+                    yield raw.rstrip("\n").encode("utf-8")
+            return
+        pos, end = 0, len(mm)
+        while pos < end:
+            nl = mm.find(b"\n", pos)
+            last = nl == -1
+            if last:
+                nl = end
+            seg = mm[pos:nl]
+            if not seg.isascii():
+                seg = seg.decode("utf-8", "ignore").encode("utf-8")
+                if last and not seg:
+                    return  # only undecodable bytes after the last newline: text mode yields no line
+            yield seg
+            pos = nl + 1
+
+def shard_path_for(batch_id: int) -> str:
+    return os.path.join(FINAL_FOLDER, f"part-{batch_id:06d}.txt")
+
+def process_file(file_path: str, shard_path: str):
     local = {
         "file_name": os.path.basename(file_path),
         "lines_processed": 0,
@@ -113,24 +154,37 @@ def process_file(file_path: str):
         "nonempty_no_mobile": 0,   # moved
         "nonempty_with_mobile": 0, # split
         "output_lines": 0,
-        "bracket_lines": [],
+        "bracket_count": 0,        # lines appended to the batch's shard
         "error": None,
     }
+    bracket_buf = bytearray()
+    out_buf = bytearray()
     out_path = os.path.join(OUTPUT_FOLDER, os.path.basename(file_path))
 
     try:
-        with open(file_path, "r", encoding="utf-8", errors="ignore") as f_in, \
-             open(out_path, "w", encoding="utf-8") as f_out:
+        with open(file_path, "rb") as f_in, \
+             open(out_path, "wb") as f_out:
 
-            for raw in f_in:
+            for braw in _iter_raw_lines(f_in, file_path):
                 local["lines_processed"] += 1
-                line = raw.rstrip("\n")
+                if len(out_buf) >= WRITE_BUFFER:
+                    f_out.write(out_buf)
+                    out_buf.clear()
+
+                # RE_KEYVAL needs one of the key names; anything else is unchanged
+                if KEY_CUSTNO_B not in braw and KEY_MOBNO_B not in braw:
+                    out_buf += braw
+                    out_buf += b"\n"
+                    local["output_lines"] += 1
+                    continue
+
+                line = braw.decode("utf-8")
 
                 # Try to parse "[...]" head and remainder
                 mhead = RE_HEAD.match(line)
                 if not mhead:
                     # no bracket head → unchanged
-                    f_out.write(line + "\n")
+                    out_buf += (line + "\n").encode("utf-8")
                     local["output_lines"] += 1
                     continue
 
@@ -139,38 +193,51 @@ def process_file(file_path: str):
                 # Validate bracket is [CustomerNo:digits] or [Mobile-No:digits]
                 if not RE_KEYVAL.match(bracket):
                     # head bracket isn't the kept key → unchanged
-                    f_out.write(line + "\n")
+                    out_buf += (line + "\n").encode("utf-8")
                     local["output_lines"] += 1
                     continue
 
                 # Must have a path separated by the LAST ';'
-                if ";" not in tail:
+                semi = tail.rfind(";")
+                if semi < 0:
                     # unexpected, keep unchanged
-                    f_out.write(line + "\n")
+                    out_buf += (line + "\n").encode("utf-8")
                     local["output_lines"] += 1
                     continue
 
-                body, path = tail.rsplit(";", 1)
-                body, path = body.strip(), path.strip()
+                body = tail[:semi].strip()
+                path = tail[semi + 1:].strip()
 
                 if body == "":
                     # This is the "nonempty_no_mobile" shape → move as-is
                     local["nonempty_no_mobile"] += 1
                     local["lines_removed"] += 1
                     # exact original line to final file
-                    local["bracket_lines"].append(f"{bracket};{path}")
+                    bracket_buf.extend(f"{bracket};{path}".encode("utf-8"))
+                    bracket_buf.extend(b"\n")
+                    local["bracket_count"] += 1
                     continue
                 else:
                     # "nonempty_with_mobile" shape → split
                     local["nonempty_with_mobile"] += 1
                     local["lines_modified"] += 1
                     # bracket+path to final
-                    local["bracket_lines"].append(f"{bracket};{path}")
+                    bracket_buf.extend(f"{bracket};{path}".encode("utf-8"))
+                    bracket_buf.extend(b"\n")
+                    local["bracket_count"] += 1
                     # body+path stays in rewritten output
-                    f_out.write(f"{body};{path}\n")
+                    out_buf += f"{body};{path}\n".encode("utf-8")
                     local["output_lines"] += 1
                     continue
 
+            if out_buf:
+                f_out.write(out_buf)
+
+        # Whole file done → append its bracket lines to the batch's shard
+        if bracket_buf:
+            with open(shard_path, "ab") as f_shard:
+                f_shard.write(bracket_buf)
+
     except Exception as e:
         try:
             if os.path.exists(out_path):
@@ -178,9 +245,15 @@ def process_file(file_path: str):
         except Exception:
             pass
         local["error"] = f"{local['file_name']}: {type(e).__name__}: {e}"
+        local["bracket_count"] = 0  # nothing reached the shard
 
     return local
 
+def process_files(batch_id: int, batch):
+    """Runs process_file over a batch of paths in one task (one IPC round-trip)."""
+    shard_path = shard_path_for(batch_id)
+    return [process_file(fp, shard_path) for fp in batch]
+
 # ---------- resume helpers ----------
 def load_completed_set(log_path: str):
     completed = set()
@@ -192,9 +265,21 @@ def load_completed_set(log_path: str):
                     completed.add(name)
     return completed
 
-def append_completed(log_path: str, file_name: str):
-    with open(log_path, "a", encoding="utf-8") as f:
-        f.write(file_name + "\n")
+# ---------- shard merge ----------
+def merge_shard(batch_id: int):
+    """Append one batch's shard to FINAL_PATH; call before its files go to RESUME_LOG."""
+    sp = shard_path_for(batch_id)
+    if not os.path.exists(sp):
+        return  # batch produced no bracket lines
+    with open(FINAL_PATH, "ab") as f_final, open(sp, "rb") as f_shard:
+        shutil.copyfileobj(f_shard, f_final, 1 << 20)
+        f_final.flush()
+    os.remove(sp)
+
+def discard_shards():
+    """Drop shards never merged (failed/interrupted batches); their files get re-run."""
+    for sp in glob.glob(SHARD_GLOB):
+        os.remove(sp)
 
 # ---------- summary ----------
 def write_summary(summary, case_baseline):
@@ -266,17 +351,17 @@ def main():
     os.makedirs(OUTPUT_FOLDER, exist_ok=True)
     os.makedirs(FINAL_FOLDER, exist_ok=True)
 
-    all_files = sorted(
-        os.path.join(INPUT_FOLDER, f)
-        for f in os.listdir(INPUT_FOLDER)
-        if os.path.isfile(os.path.join(INPUT_FOLDER, f))
-        and os.path.splitext(f)[1].lower() in ALLOWED_EXTS
-    )
+    with os.scandir(INPUT_FOLDER) as it:
+        all_files = sorted(
+            e.path for e in it
+            if e.is_file() and e.name.lower().endswith(ALLOWED_EXTS)
+        )
     if not all_files:
         print(f"No {ALLOWED_EXTS} files found in INPUT_FOLDER.", file=sys.stderr)
         return
 
     case_baseline = scan_case_source_folder(CASE_SOURCE_FOLDER) if CASE_SOURCE_FOLDER else None
+    discard_shards()  # leftovers of an interrupted run
 
     completed = set()
     if os.path.exists(RESUME_LOG):
@@ -313,15 +398,38 @@ def main():
     }
 
     overall_bar = tqdm(total=len(pending_files), desc="Overall", unit="file", leave=True)
+    # One line-buffered handle for the whole run instead of open/close per file
+    resume_fh = open(RESUME_LOG, "a", encoding="utf-8", buffering=1)
     try:
         with ProcessPoolExecutor(max_workers=MAX_WORKERS) as ex:
-            futures = {ex.submit(process_file, fp): fp for fp in pending_files}
+            # Cap the batch so every worker still gets several tasks on small runs
+            per_task = max(1, min(FILES_PER_TASK, len(pending_files) // (MAX_WORKERS * 4)))
+            batches = [pending_files[i:i + per_task]
+                       for i in range(0, len(pending_files), per_task)]
+            futures = {ex.submit(process_files, i, b): (i, b) for i, b in enumerate(batches)}
             for fut in as_completed(futures):
-                file_path = futures[fut]
-                base_name = os.path.basename(file_path)
+                batch_id, batch = futures[fut]
                 try:
-                    res = fut.result()
+                    batch_results = fut.result()
+                    batch_error = None
+                except Exception as e:
+                    batch_results = [None] * len(batch)
+                    batch_error = e
+
+                # Shard goes to FINAL_PATH before its files are logged: an
+                # interruption in between re-runs them (duplicates, never loss)
+                if batch_error is None:
+                    merge_shard(batch_id)
+
+                for file_path, res in zip(batch, batch_results):
+                    base_name = os.path.basename(file_path)
                     summary["files_scanned"] += 1
+                    if batch_error is not None:
+                        summary["files_error"] += 1
+                        summary["errors"].append(f"{base_name}: worker exception: {batch_error}")
+                        overall_bar.update(1)
+                        continue
+
                     summary["total_lines_processed"] += res["lines_processed"]
                     summary["total_lines_removed"] += res["lines_removed"]
                     summary["total_lines_modified"] += res["lines_modified"]
@@ -329,23 +437,16 @@ def main():
                     summary["nonempty_with_mobile"] += res["nonempty_with_mobile"]
                     summary["updated_line_count"] += res["output_lines"]
 
-                    if res["bracket_lines"]:
-                        with open(FINAL_PATH, "a", encoding="utf-8") as f:
-                            for l in res["bracket_lines"]:
-                                f.write(l + "\n")
-                                summary["final_file_lines"] += 1
+                    summary["final_file_lines"] += res["bracket_count"]
 
-                    with open(RESUME_LOG, "a", encoding="utf-8") as r:
-                        r.write(base_name + "\n")
+                    resume_fh.write(base_name + "\n")
 
                     summary["files_success"] += 1
-                except Exception as e:
-                    summary["files_scanned"] += 1
-                    summary["files_error"] += 1
-                    summary["errors"].append(f"{base_name}: worker exception: {e}")
-                overall_bar.update(1)
+                    overall_bar.update(1)
     finally:
         overall_bar.close()
+        resume_fh.close()
+        discard_shards()
         write_summary(summary, case_baseline)
 
 if __name__ == "__main__":
@@ -1,8 +1,11 @@
 import os
+import re
 import sys
 import time
 import traceback
-from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing as mp
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime, timedelta
 from tqdm import tqdm
 
@@ -13,6 +16,10 @@ SUMMARY_FILE = "summary_report.txt" # Saved in current working dir
 RESUME_LOG = "resume_files.log"     # Checkpoint log in current working dir
 MAX_WORKERS = 6                     # Use 6–8 for optimal performance
 ALLOWED_EXTS = (".txt", ".log")     # File extensions to process
+READ_BUFFER_SIZE = 128 * 1024       # Bytes read (and cleaned) per block
+FILES_PER_TASK = 32                 # Max files handed to a worker per submitted task
+MAX_IN_FLIGHT = MAX_WORKERS * 4     # Max tasks queued in the pool at any time
+ETA_REFRESH_SECS = 0.5              # Min seconds between progress-bar ETA refreshes
 # =========================== #
 
 # Exact string fragments to be removed from each line
@@ -43,51 +50,99 @@ FRAGMENTS_TO_REMOVE = [
     "vprRequestAppType=null, ",
     "lastRequestShopPhoto=null"
 ]
+# All fragments are ASCII, so they can be removed from the raw UTF-8 bytes.
+# One alternation does the whole list in a single scan. A fragment containing an
+# earlier one (e.g. "appVersion-null, " after "Version-null, ") could never match
+# under the old one-by-one replace, so it is left out to keep output identical.
+_FRAGMENTS_B = [f.encode("ascii") for f in FRAGMENTS_TO_REMOVE]
+_STRIP_RE = re.compile(b"|".join(
+    re.escape(f) for i, f in enumerate(_FRAGMENTS_B)
+    if not any(e in f for e in _FRAGMENTS_B[:i])
+))
+
+def _normalize_block(region: bytes) -> bytes:
+    """
+    Make a block of whole lines byte-identical to what text mode would have
+    produced: invalid UTF-8 dropped (errors="ignore") and '\\r\\n' / lone '\\r'
+    turned into '\\n'. Valid UTF-8 without '\\r' (the usual case) is returned as-is.
+    """
+    if b"\r" not in region:
+        if region.isascii():
+            return region
+        try:
+            region.decode("utf-8")  # validate only; no re-encode needed
+            return region
+        except UnicodeDecodeError:
+            pass
+    text = region.decode("utf-8", "ignore")
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text.encode("utf-8")
 
 def process_file(file_path: str) -> dict:
     """
     Runs in a separate process. Removes specific fragments and writes to a new .txt file.
     """
+    base_name = os.path.basename(file_path)
     local = {
-        "file_name": os.path.basename(file_path),
+        "file_name": base_name,
         "lines_processed": 0,
         "error": None,
         "changes_made": 0,  # counts lines where any fragment was removed
     }
-    out_path = os.path.join(OUTPUT_FOLDER, os.path.basename(file_path))
+    out_path = os.path.join(OUTPUT_FOLDER, base_name)
 
     # Clean any stale partial from a previous failed attempt
     try:
-        if os.path.exists(out_path):
-            os.remove(out_path)
-    except Exception:
+        os.remove(out_path)  # one syscall; usually absent
+    except OSError:
         pass
 
     try:
-        with open(file_path, "r", encoding="utf-8", errors="ignore") as f_in, \
-             open(out_path, "w", encoding="utf-8") as f_out:
-
-            for line in f_in:
-                local["lines_processed"] += 1
-                cleaned = line
-                changed = False
-
-                for fragment in FRAGMENTS_TO_REMOVE:
-                    if fragment in cleaned:
-                        cleaned = cleaned.replace(fragment, "")
-                        changed = True
-
-                if changed:
-                    local["changes_made"] += 1
+        with open(file_path, "rb") as f_in, open(out_path, "wb") as f_out:
+            strip = _STRIP_RE.sub  # local lookup in the loop
+            tail = b""  # partial last line carried into the next block
+            while True:
+                chunk = f_in.read(READ_BUFFER_SIZE)
+                if chunk:
+                    buf = tail + chunk
+                    cut = buf.rfind(b"\n") + 1
+                    if not cut:
+                        tail = buf
+                        continue
+                    block, tail = buf[:cut], buf[cut:]
+                elif tail:
+                    block, tail = tail, b""  # final line without a newline
+                else:
+                    break
+
+                block = _normalize_block(block)
+                if not block:
+                    continue
+                local["lines_processed"] += block.count(b"\n") + (not block.endswith(b"\n"))
+
+                # Fragments never span a newline, so one sub over the whole
+                # block gives exactly the per-line result.
+                # Every fragment contains "null" or "-RET"; a block with
+                # neither needs no sub() (two fast substring scans instead)
+                if b"null" in block or b"-RET" in block:
+                    cleaned = strip(b"", block)
+                else:
+                    cleaned = block
+
+                if cleaned != block:
+                    # a line changed iff it got shorter; compare per line
+                    local["changes_made"] += sum(
+                        1 for a, b in zip(block.split(b"\n"), cleaned.split(b"\n")) if a != b
+                    )
 
                 f_out.write(cleaned)
 
     except Exception as e:
         # Remove partial output so the file is retried next run
         try:
-            if os.path.exists(out_path):
-                os.remove(out_path)
-        except Exception:
+            os.remove(out_path)
+        except OSError:
             pass
         err = f"{local['file_name']}: {e.__class__.__name__}: {e}"
         err += "\n" + "".join(traceback.format_exception_only(type(e), e)).strip()
@@ -95,6 +150,25 @@ def process_file(file_path: str) -> dict:
 
     return local
 
+def process_files(batch: list) -> list:
+    """Runs process_file over a batch of paths in one task (one IPC round-trip)."""
+    return [process_file(fp) for fp in batch]
+
+def iter_completed(ex, fn, tasks, max_in_flight: int):
+    """
+    Yields (task, future) as futures finish, keeping at most max_in_flight
+    submitted; a new task is submitted each time one completes.
+    """
+    tasks = iter(tasks)
+    futures = {ex.submit(fn, t): t for t in islice(tasks, max_in_flight)}
+    while futures:
+        done, _ = wait(futures, return_when=FIRST_COMPLETED)
+        for fut in done:
+            task = futures.pop(fut)
+            for nxt in islice(tasks, 1):
+                futures[ex.submit(fn, nxt)] = nxt
+            yield task, fut
+
 def load_completed_set(log_path: str) -> set:
     """Loads a set of completed files from the resume log."""
     completed = set()
@@ -106,11 +180,6 @@ def load_completed_set(log_path: str) -> set:
                     completed.add(name)
     return completed
 
-def append_completed(log_path: str, file_name: str):
-    """Appends a completed file name to the resume log."""
-    with open(log_path, "a", encoding="utf-8") as f:
-        f.write(file_name + "\n")
-
 def write_summary(summary_data):
     """Writes the summary report to a file."""
     summary_data["end_ts"] = time.time()
@@ -141,12 +210,11 @@ def main():
 
     os.makedirs(OUTPUT_FOLDER, exist_ok=True)
 
-    all_files = sorted(
-        os.path.join(INPUT_FOLDER, f)
-        for f in os.listdir(INPUT_FOLDER)
-        if os.path.isfile(os.path.join(INPUT_FOLDER, f))
-        and os.path.splitext(f)[1].lower() in ALLOWED_EXTS
-    )
+    with os.scandir(INPUT_FOLDER) as it:
+        all_files = sorted(
+            e.path for e in it
+            if e.is_file() and e.name.lower().endswith(ALLOWED_EXTS)
+        )
 
     if not all_files:
         print(f"No {ALLOWED_EXTS} files found in INPUT_FOLDER.", file=sys.stderr)
@@ -172,37 +240,52 @@ def main():
     }
 
     overall_bar = tqdm(total=len(pending_files), desc="Overall", unit="file", leave=True)
+    # One line-buffered handle for the whole run instead of open/close per file
+    resume_fh = open(RESUME_LOG, "a", encoding="utf-8", buffering=1)
+    last_eta_update = 0.0
 
     try:
-        with ProcessPoolExecutor(max_workers=MAX_WORKERS) as ex:
-            futures = {ex.submit(process_file, fp): fp for fp in pending_files}
-
-            for fut in as_completed(futures):
-                file_path = futures[fut]
-                base_name = os.path.basename(file_path)
-
+        # fork: workers inherit the already-compiled _STRIP_RE pages instead of
+        # re-importing this module (spawn/forkserver). Linux only; others keep the default
+        ctx = mp.get_context("fork") if sys.platform.startswith("linux") else None
+        with ProcessPoolExecutor(max_workers=MAX_WORKERS, mp_context=ctx) as ex:
+            # Cap the batch so every worker still gets several tasks on small runs
+            per_task = max(1, min(FILES_PER_TASK, len(pending_files) // (MAX_WORKERS * 4)))
+            batches = (pending_files[i:i + per_task]
+                       for i in range(0, len(pending_files), per_task))
+
+            for batch, fut in iter_completed(ex, process_files, batches, MAX_IN_FLIGHT):
                 try:
-                    local_result = fut.result()
+                    batch_results = fut.result()
+                    batch_error = None
+                except Exception as e:
+                    batch_results = [None] * len(batch)
+                    batch_error = e
+
+                for file_path, local_result in zip(batch, batch_results):
+                    base_name = os.path.basename(file_path)
                     summary["files_scanned"] += 1
-                    summary["total_lines_processed"] += local_result["lines_processed"]
-                    summary["total_changes_made"] += local_result["changes_made"]
 
-                    if local_result["error"]:
+                    if batch_error is not None:
                         summary["files_error"] += 1
-                        summary["errors"].append(local_result["error"])
+                        summary["errors"].append(f"{base_name}: worker exception: {batch_error}")
                     else:
-                        summary["files_success"] += 1
-                        append_completed(RESUME_LOG, base_name)
-
-                except Exception as e:
-                    summary["files_scanned"] += 1
-                    summary["files_error"] += 1
-                    summary["errors"].append(f"{base_name}: worker exception: {e}")
-
-                overall_bar.update(1)
-
-                # Calculate and display ETA
-                if summary["files_scanned"] > 0:
+                        summary["total_lines_processed"] += local_result["lines_processed"]
+                        summary["total_changes_made"] += local_result["changes_made"]
+
+                        if local_result["error"]:
+                            summary["files_error"] += 1
+                            summary["errors"].append(local_result["error"])
+                        else:
+                            summary["files_success"] += 1
+                            resume_fh.write(base_name + "\n")
+
+                    overall_bar.update(1)
+
+                # Calculate and display ETA (throttled: every postfix re-renders the bar)
+                now = time.monotonic()
+                if summary["files_scanned"] > 0 and now - last_eta_update >= ETA_REFRESH_SECS:
+                    last_eta_update = now
                     elapsed_time = time.time() - summary["start_ts"]
                     avg_time_per_file = elapsed_time / summary["files_scanned"]
                     remaining_files = len(pending_files) - summary["files_scanned"]
@@ -212,6 +295,7 @@ def main():
 
     finally:
         overall_bar.close()
+        resume_fh.close()
         write_summary(summary)
 
 if __name__ == "__main__":
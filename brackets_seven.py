@@ -1,9 +1,13 @@
 import os
 import sys
 import time
+import mmap
 import re
+import shutil
 import traceback
-from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing as mp
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime, timedelta
 from tqdm import tqdm
 
@@ -17,26 +21,20 @@ ALLOWED_EXTS = (".txt",)            # Process only .txt files
 
 CASE_SENSITIVE = True               # 'CustomerId' must match case exactly
 EMIT_SINGLE_SPACE = True            # Normalize join spacing around kept items
+BLOCK_SIZE = 1 << 20                # Bytes of whole lines read, transformed and written per step
+MAX_IN_FLIGHT = MAX_WORKERS * 4     # Max files queued in the pool at any time
+ETA_REFRESH_SECS = 0.5              # Min seconds between progress-bar ETA refreshes
+RESUME_SYNC_EVERY = 32              # fsync the resume log after this many new entries...
+RESUME_SYNC_SECS = 5.0              # ...or this many seconds, whichever comes first
+SPLIT_THRESHOLD = 256 << 20         # Files above this many bytes are split across workers
 # =========================== #
 
-# Preamble patterns (allow 1+ spaces between tokens; tolerate leading spaces).
+# Preamble shapes (1+ whitespace between tokens; leading whitespace tolerated):
 # 1) [T1] [T2] [T3] [T4] [T5] [T6] [T7] - [T8] <body>
-PREAMBLE8_RE = re.compile(
-    r'^\s*'
-    r'(\[[^\]]*\])\s+'  # T1
-    r'(\[[^\]]*\])\s+'  # T2
-    r'(\[[^\]]*\])\s+'  # T3
-    r'(\[[^\]]*\])\s+'  # T4
-    r'(\[[^\]]*\])\s+'  # T5
-    r'(\[[^\]]*\])\s+'  # T6
-    r'(\[[^\]]*\])\s+'  # T7
-    r'-\s+'             # hyphen
-    r'(\[[^\]]*\])'     # T8
-    r'(.*)$'            # body
-)
-
 # 2) [T1] [T2] [T3] [T4] [T5] [T6] [T7] - <body>
-PREAMBLE7_RE = re.compile(
+# One pattern covers both: T8 is an optional group tried before the body, so a
+# line gets the 8-token split whenever it has one, else the 7-token split.
+PREAMBLE_RE = re.compile(
     r'^\s*'
     r'(\[[^\]]*\])\s+'  # T1
     r'(\[[^\]]*\])\s+'  # T2
@@ -46,51 +44,79 @@ PREAMBLE7_RE = re.compile(
     r'(\[[^\]]*\])\s+'  # T6
     r'(\[[^\]]*\])\s+'  # T7
     r'-\s+'             # hyphen
+    r'(\[[^\]]*\])?'    # T8 (optional)
     r'(.*)$'            # body
 )
+_preamble_match = PREAMBLE_RE.match  # bound once: no attribute lookup per line
+
+# Same shapes as PREAMBLE_RE, anchored on a literal '\n' so one findall over a
+# block counts its preamble lines in C (the block gets a '\n' prepended for the
+# first line). Whitespace and tokens never cross '\n'; the group holds T8 or "".
+_WS_NL = r'[^\S\n]'
+_TOK_NL = r'\[[^\]\n]*\]'
+PREAMBLE_NL_RE = re.compile(rf'\n{_WS_NL}*(?:{_TOK_NL}{_WS_NL}+){{7}}-{_WS_NL}+({_TOK_NL})?')
 
 CUSTOMER_KEY = "CustomerId:"
+CUSTOMER_PREFIX = "[" + CUSTOMER_KEY
+CUSTOMER_PREFIX_LEN = len(CUSTOMER_PREFIX)  # 12
+CUSTOMER_KEY_LOWER = CUSTOMER_KEY.lower()
+
+# classify_customer_bracket() results
+CUST_NONE, CUST_NONEMPTY, CUST_EMPTY = 0, 1, 2
 
-def classify_customer_bracket(token: str, case_sensitive: bool) -> str:
+def _classify_customer_bracket_cs(token: str) -> int:
     """
     token: "[CustomerId: ...]" or other "[...]"
-    Returns: "none" | "empty" | "nonempty"
+    Returns: CUST_NONE | CUST_EMPTY | CUST_NONEMPTY
     """
+    if not token.startswith(CUSTOMER_PREFIX) or not token.endswith("]"):
+        return CUST_NONE
+    value = token[CUSTOMER_PREFIX_LEN:-1]
+    # same test as value.strip() != "" without building the stripped copy
+    return CUST_NONEMPTY if value and not value.isspace() else CUST_EMPTY
+
+def _classify_customer_bracket_ci(token: str) -> int:
+    """Case-insensitive variant of _classify_customer_bracket_cs."""
     if not (token.startswith("[") and token.endswith("]")):
-        return "none"
-
+        return CUST_NONE
     inner = token[1:-1]
-    key = CUSTOMER_KEY if case_sensitive else CUSTOMER_KEY.lower()
-    target = inner if case_sensitive else inner.lower()
-    if not target.startswith(key):
-        return "none"
+    if not inner.lower().startswith(CUSTOMER_KEY_LOWER):
+        return CUST_NONE
+    value = inner[len(CUSTOMER_KEY_LOWER):]
+    return CUST_NONEMPTY if value and not value.isspace() else CUST_EMPTY
 
-    suffix = inner[len(CUSTOMER_KEY):] if case_sensitive else inner[len(key):]
-    return "empty" if suffix.strip() == "" else "nonempty"
+# transform_line() / transform_preamble() result flags
+F_MATCHED8, F_MATCHED7, F_CHANGED, F_REMOVED, F_REDUCED = 1, 2, 4, 8, 16
+
+# Picked once so the per-token call carries no case_sensitive branch
+classify_customer_bracket = (
+    _classify_customer_bracket_cs if CASE_SENSITIVE else _classify_customer_bracket_ci
+)
 
 def transform_preamble(tokens, body):
     """
     Apply CustomerId rules over the given preamble tokens (list of strings) and body.
-    Returns (new_text, changed: bool, removed: bool, reduced: bool).
-    - removed=True when whole preamble is dropped (empty CustomerId).
-    - reduced=True when only [CustomerId: non-empty] is kept from preamble.
+    Returns (new_text, flags) with flags 0 (unchanged) or F_CHANGED plus:
+    - F_REMOVED when whole preamble is dropped (empty CustomerId).
+    - F_REDUCED when only [CustomerId: non-empty] is kept from preamble.
     """
+    classify = classify_customer_bracket  # local lookup in the loop
     cust_index = -1
-    cust_class = "none"
+    cust_class = CUST_NONE
     for i, tok in enumerate(tokens):
-        c = classify_customer_bracket(tok, CASE_SENSITIVE)
-        if c != "none":
+        c = classify(tok)
+        if c:
             cust_index, cust_class = i, c
             break
 
     if cust_index == -1:
         # no CustomerId in preamble -> unchanged
-        return body if False else None, False, False, False
+        return None, 0
 
-    if cust_class == "empty":
+    if cust_class == CUST_EMPTY:
         # Drop entire preamble; keep only body
         out_body = body.lstrip() if EMIT_SINGLE_SPACE else body
-        return out_body, True, True, False
+        return out_body, F_CHANGED | F_REMOVED
     else:
         # Keep only that CustomerId token + body
         keep_token = tokens[cust_index]
@@ -99,99 +125,254 @@ def transform_preamble(tokens, body):
             new_text = keep_token + ((" " + out_body) if out_body else "")
         else:
             new_text = keep_token + body
-        return new_text, True, False, True
+        return new_text, F_CHANGED | F_REDUCED
 
-def transform_line(line: str) -> (str, dict):
+def split_preamble(base: str):
     """
-    Try 8-token preamble first; if not matched, try 7-token.
-    Returns the (possibly) transformed line and a stats dict describing the change.
+    Split a line (no trailing newline) into its preamble tokens and body.
+    Returns (tokens, body) with 8 tokens when '- ' is followed by a closed
+    bracket, 7 tokens otherwise, or None when the line has no such preamble.
     """
-    stats = {"matched8": False, "matched7": False, "removed": False, "reduced": False, "changed": False}
-
-    has_nl = line.endswith("\n")
-    base = line[:-1] if has_nl else line
-
-    m8 = PREAMBLE8_RE.match(base)
-    if m8:
-        stats["matched8"] = True
-        tokens = list(m8.groups()[:8])
-        body = m8.group(9)
-        new_text, changed, removed, reduced = transform_preamble(tokens, body)
-        if changed:
-            stats.update({"changed": True, "removed": removed, "reduced": reduced})
-            return (new_text + ("\n" if has_nl else "")), stats
-        else:
-            # unchanged
-            return line, stats
-
-    m7 = PREAMBLE7_RE.match(base)
-    if m7:
-        stats["matched7"] = True
-        tokens = list(m7.groups()[:7])
-        body = m7.group(8)
-        new_text, changed, removed, reduced = transform_preamble(tokens, body)
-        if changed:
-            stats.update({"changed": True, "removed": removed, "reduced": reduced})
-            return (new_text + ("\n" if has_nl else "")), stats
-        else:
-            return line, stats
-
-    # No preamble matched
-    return line, stats
+    m = _preamble_match(base)
+    if m is None:
+        return None
+    g = m.groups()
+    if g[7] is None:
+        return g[:7], g[8]
+    return g[:8], g[8]
+
+def transform_line(line: str) -> (str, int):
+    """
+    Split off an 8-token preamble if present, else a 7-token one.
+    `line` carries no trailing newline (process_file splits blocks on '\\n'),
+    so unchanged lines are returned as the same object with no copies.
+    Returns the (possibly) transformed line and F_* flags describing the change.
+    """
+    # A preamble starts with '[' (or leading whitespace): reject anything
+    # else without entering the regex engine
+    head = line[:1]
+    if head != "[" and not head.isspace():
+        return line, 0
+
+    parsed = split_preamble(line)
+    if parsed is None:
+        # No preamble matched
+        return line, 0
+
+    tokens, body = parsed
+    matched = F_MATCHED8 if len(tokens) == 8 else F_MATCHED7
+    # Case-sensitive: no '[CustomerId:' anywhere in the preamble means no token
+    # can classify, so skip the per-token loop (one C-level find instead)
+    if CASE_SENSITIVE and line.find(CUSTOMER_PREFIX, 0, len(line) - len(body)) < 0:
+        return line, matched
+    new_text, flags = transform_preamble(tokens, body)
+    if flags:
+        return new_text, matched | flags
+    # unchanged
+    return line, matched
+
+def iter_text_blocks(f_in, start: int = 0, end: int = None):
+    """
+    Yield bytes [start, end) of the input (default: the whole file) as decoded
+    blocks of ~BLOCK_SIZE bytes, each ending on a '\\n' (except possibly the
+    last). The file is mmapped and cut with rfind (memchr); decoding matches
+    text mode: errors="ignore" and '\\r\\n' / lone '\\r' become '\\n'.
+    A '\\r\\n' pair never straddles a cut.
+    """
+    if end is None:
+        end = os.fstat(f_in.fileno()).st_size
+    if start >= end:
+        return  # nothing to read (and mmap cannot map an empty file)
+    with mmap.mmap(f_in.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        pos = start
+        while pos < end:
+            cut = mm.rfind(b"\n", pos, min(pos + BLOCK_SIZE, end))
+            if cut < 0:
+                # a single line longer than BLOCK_SIZE
+                cut = mm.find(b"\n", pos + BLOCK_SIZE, end)
+                if cut < 0:
+                    cut = end - 1
+            text = mm[pos:cut + 1].decode("utf-8", "ignore")
+            if "\r" in text:
+                text = text.replace("\r\n", "\n").replace("\r", "\n")
+            yield text
+            pos = cut + 1
+
+# Per-file counters in process_file() results, summed over the parts of a split file
+STAT_KEYS = ("lines_processed", "lines_modified", "preambles_removed",
+             "preambles_reduced", "matched8", "matched7")
+
+def new_result(base_name: str) -> dict:
+    local = {"file_name": base_name, "error": None}
+    local.update(dict.fromkeys(STAT_KEYS, 0))
+    return local
 
-def process_file(file_path: str) -> dict:
-    local = {
-        "file_name": os.path.basename(file_path),
-        "lines_processed": 0,
-        "lines_modified": 0,
-        "preambles_removed": 0,
-        "preambles_reduced": 0,
-        "matched8": 0,
-        "matched7": 0,
-        "error": None,
-    }
+def process_file(file_path: str, start: int = 0, end: int = None, part: int = None) -> dict:
+    """
+    Transform one input file into OUTPUT_FOLDER (same basename). With `part`
+    set, only bytes [start, end) are done, into "<basename>.part<part>".
+    """
+    base_name = os.path.basename(file_path)
+    local = new_result(base_name)
 
-    out_path = os.path.join(OUTPUT_FOLDER, os.path.basename(file_path))
+    out_path = os.path.join(OUTPUT_FOLDER, base_name)
+    if part is not None:
+        out_path += f".part{part}"
 
     try:
-        if os.path.exists(out_path):
-            os.remove(out_path)
-    except Exception:
+        os.remove(out_path)  # one syscall; usually absent
+    except OSError:
         pass
 
+    # Plain local counters in the loop; copied into `local` once at the end
+    lines_processed = lines_modified = preambles_removed = preambles_reduced = 0
+    matched8 = matched7 = 0
+
     try:
-        with open(file_path, "r", encoding="utf-8", errors="ignore") as f_in, \
-             open(out_path, "w", encoding="utf-8") as f_out:
-
-            for raw in f_in:
-                local["lines_processed"] += 1
-                new_line, st = transform_line(raw)
-
-                if st["matched8"]:
-                    local["matched8"] += 1
-                if st["matched7"]:
-                    local["matched7"] += 1
-                if st["changed"]:
-                    local["lines_modified"] += 1
-                    if st["removed"]:
-                        local["preambles_removed"] += 1
-                    elif st["reduced"]:
-                        local["preambles_reduced"] += 1
-
-                f_out.write(new_line)
+        with open(file_path, "rb") as f_in, open(out_path, "wb") as f_out:
+
+            transform = transform_line  # local lookup in the loop
+            for text in iter_text_blocks(f_in, start, end):
+                if CASE_SENSITIVE and CUSTOMER_PREFIX not in text:
+                    # No line in this block can change: count the stats in C
+                    # and write the block through untouched
+                    lines_processed += text.count("\n") + (text != "" and not text.endswith("\n"))
+                    t8 = PREAMBLE_NL_RE.findall("\n" + text)
+                    eight = len(t8) - t8.count("")
+                    matched8 += eight
+                    matched7 += len(t8) - eight
+                    f_out.write(text.encode("utf-8"))
+                    continue
+
+                # Lines go through transform_line without their '\n' and are
+                # re-joined; a final line lacking one stays without it.
+                lines = text.split("\n")
+                if not lines[-1]:
+                    lines.pop()  # block ended with '\n'
+                out_lines = []
+                for raw in lines:
+                    lines_processed += 1
+                    new_line, flags = transform(raw)
+
+                    if flags:
+                        if flags & F_MATCHED8:
+                            matched8 += 1
+                        elif flags & F_MATCHED7:
+                            matched7 += 1
+                        if flags & F_CHANGED:
+                            lines_modified += 1
+                            if flags & F_REMOVED:
+                                preambles_removed += 1
+                            elif flags & F_REDUCED:
+                                preambles_reduced += 1
+
+                    out_lines.append(new_line)
+
+                out_text = "\n".join(out_lines)
+                if text.endswith("\n"):
+                    out_text += "\n"
+                f_out.write(out_text.encode("utf-8"))
 
     except Exception as e:
         try:
-            if os.path.exists(out_path):
-                os.remove(out_path)
-        except Exception:
+            os.remove(out_path)
+        except OSError:
             pass
         err = f"{local['file_name']}: {e.__class__.__name__}: {e}"
         err += "\n" + "".join(traceback.format_exception_only(type(e), e)).strip()
         local["error"] = err
 
+    local.update({
+        "lines_processed": lines_processed,
+        "lines_modified": lines_modified,
+        "preambles_removed": preambles_removed,
+        "preambles_reduced": preambles_reduced,
+        "matched8": matched8,
+        "matched7": matched7,
+    })
     return local
 
+def process_task(task: tuple) -> dict:
+    """Runs process_file over a (file_path,) or (file_path, start, end, part) task."""
+    return process_file(*task)
+
+def split_ranges(file_path: str, size: int, parts: int) -> list:
+    """
+    Cut a file into up to `parts` (start, end) byte ranges of about equal size,
+    each moved forward to start right after a '\\n'.
+    """
+    points = [0]
+    with open(file_path, "rb") as f:
+        for i in range(1, parts):
+            f.seek(size * i // parts)
+            f.readline()  # scan forward to the next line start
+            pos = f.tell()
+            if pos >= size:
+                break
+            if pos > points[-1]:
+                points.append(pos)
+    points.append(size)
+    return list(zip(points, points[1:]))
+
+def merge_parts(file_path: str, results: list) -> dict:
+    """
+    Sum the part results of a split file and concatenate its part outputs (in
+    order) into the final output. Parts are removed either way; on any part
+    error the file gets no output and the first error is reported.
+    """
+    base_name = os.path.basename(file_path)
+    merged = new_result(base_name)
+    for res in results:
+        for key in STAT_KEYS:
+            merged[key] += res.get(key, 0)
+        if res["error"] and not merged["error"]:
+            merged["error"] = res["error"]
+
+    out_path = os.path.join(OUTPUT_FOLDER, base_name)
+    part_paths = [f"{out_path}.part{i}" for i in range(len(results))]
+    try:
+        if not merged["error"]:
+            with open(out_path, "wb") as f_out:
+                for part_path in part_paths:
+                    with open(part_path, "rb") as f_part:
+                        shutil.copyfileobj(f_part, f_out, BLOCK_SIZE)
+    except Exception as e:
+        merged["error"] = f"{base_name}: merge failed: {e.__class__.__name__}: {e}"
+    if merged["error"]:
+        part_paths.append(out_path)
+    for path in part_paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    return merged
+
+def file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0  # let process_file report it
+
+def iter_completed(ex, fn, tasks, max_in_flight: int):
+    """
+    Yields (task, future) as futures finish, keeping at most max_in_flight
+    submitted; a new task is submitted each time one completes.
+    """
+    tasks = iter(tasks)
+    futures = {ex.submit(fn, t): t for t in islice(tasks, max_in_flight)}
+    while futures:
+        done, _ = wait(futures, return_when=FIRST_COMPLETED)
+        for fut in done:
+            task = futures.pop(fut)
+            for nxt in islice(tasks, 1):
+                futures[ex.submit(fn, nxt)] = nxt
+            yield task, fut
+
+def sync_resume(fh):
+    """Push buffered resume-log entries to disk."""
+    fh.flush()
+    os.fsync(fh.fileno())
+
 def load_completed_set(log_path: str) -> set:
     completed = set()
     if os.path.exists(log_path):
@@ -202,10 +383,6 @@ def load_completed_set(log_path: str) -> set:
                     completed.add(name)
     return completed
 
-def append_completed(log_path: str, file_name: str):
-    with open(log_path, "a", encoding="utf-8") as f:
-        f.write(file_name + "\n")
-
 def write_summary(summary):
     summary["end_ts"] = time.time()
     with open(SUMMARY_FILE, "w", encoding="utf-8") as f:
@@ -241,12 +418,11 @@ def main():
 
     os.makedirs(OUTPUT_FOLDER, exist_ok=True)
 
-    all_files = sorted(
-        os.path.join(INPUT_FOLDER, f)
-        for f in os.listdir(INPUT_FOLDER)
-        if os.path.isfile(os.path.join(INPUT_FOLDER, f))
-        and os.path.splitext(f)[1].lower() in ALLOWED_EXTS
-    )
+    with os.scandir(INPUT_FOLDER) as it:
+        all_files = sorted(
+            e.path for e in it
+            if e.is_file() and os.path.splitext(e.name)[1].lower() in ALLOWED_EXTS
+        )
 
     if not all_files:
         print(f"No {ALLOWED_EXTS} files found in INPUT_FOLDER.", file=sys.stderr)
@@ -259,6 +435,25 @@ def main():
         print("All files already processed per resume log. Nothing to do.")
         return
 
+    # Largest files first (LPT): a big file picked up last would leave the
+    # other workers idle while it finishes
+    pending_files.sort(key=file_size, reverse=True)
+
+    # A file above SPLIT_THRESHOLD would still pin one worker on its own, so it
+    # runs as one task per line-aligned byte range; part results are collected
+    # in split_results until the file's last part is in
+    tasks = []
+    split_results = {}  # file_path -> part results by index (None until in)
+    for fp in pending_files:
+        size = file_size(fp)
+        if size > SPLIT_THRESHOLD and MAX_WORKERS > 1:
+            ranges = split_ranges(fp, size, MAX_WORKERS)
+            if len(ranges) > 1:
+                split_results[fp] = [None] * len(ranges)
+                tasks.extend((fp, start, end, i) for i, (start, end) in enumerate(ranges))
+                continue
+        tasks.append((fp,))
+
     summary = {
         "start_ts": time.time(),
         "end_ts": None,
@@ -276,48 +471,74 @@ def main():
     }
 
     overall_bar = tqdm(total=len(pending_files), desc="Overall", unit="file", leave=True)
+    # One buffered handle for the whole run, synced in batches; a crash loses
+    # at most a batch of entries, and those files are simply redone next run
+    resume_fh = open(RESUME_LOG, "a", encoding="utf-8")
+    resume_unsynced = 0
+    last_resume_sync = time.monotonic()
+    last_eta_update = 0.0
+    bar_update = overall_bar.update  # bound once for the result loop
+    monotonic = time.monotonic
 
     try:
-        with ProcessPoolExecutor(max_workers=MAX_WORKERS) as ex:
-            futures = {ex.submit(process_file, fp): fp for fp in pending_files}
-
-            for fut in as_completed(futures):
-                file_path = futures[fut]
-                base_name = os.path.basename(file_path)
-
+        # fork: workers inherit the already-compiled PREAMBLE_RE instead of
+        # re-importing this module (spawn/forkserver). Linux only; others keep the default
+        ctx = mp.get_context("fork") if sys.platform.startswith("linux") else None
+        with ProcessPoolExecutor(max_workers=MAX_WORKERS, mp_context=ctx) as ex:
+            for task, fut in iter_completed(ex, process_task, tasks, MAX_IN_FLIGHT):
+                file_path = task[0]
                 try:
                     res = fut.result()
-                    summary["files_scanned"] += 1
-                    summary["total_lines_processed"] += res["lines_processed"]
-                    summary["total_lines_modified"] += res["lines_modified"]
-                    summary["preambles_removed"] += res["preambles_removed"]
-                    summary["preambles_reduced"] += res["preambles_reduced"]
-                    summary["matched8"] += res["matched8"]
-                    summary["matched7"] += res["matched7"]
-
-                    if res["error"]:
-                        summary["files_error"] += 1
-                        summary["errors"].append(res["error"])
-                    else:
-                        summary["files_success"] += 1
-                        append_completed(RESUME_LOG, base_name)
-
                 except Exception as e:
-                    summary["files_scanned"] += 1
+                    res = new_result(os.path.basename(file_path))
+                    res["error"] = f"{os.path.basename(file_path)}: worker exception: {e}"
+
+                if file_path in split_results:
+                    part_results = split_results[file_path]
+                    part_results[task[3]] = res
+                    if None in part_results:
+                        continue
+                    del split_results[file_path]
+                    res = merge_parts(file_path, part_results)
+
+                summary["files_scanned"] += 1
+                summary["total_lines_processed"] += res["lines_processed"]
+                summary["total_lines_modified"] += res["lines_modified"]
+                summary["preambles_removed"] += res["preambles_removed"]
+                summary["preambles_reduced"] += res["preambles_reduced"]
+                summary["matched8"] += res["matched8"]
+                summary["matched7"] += res["matched7"]
+
+                if res["error"]:
                     summary["files_error"] += 1
-                    summary["errors"].append(f"{base_name}: worker exception: {e}")
-
-                overall_bar.update(1)
-
-                # ETA
-                elapsed = time.time() - summary["start_ts"]
-                avg = elapsed / max(1, summary["files_scanned"])
-                remaining = len(pending_files) - summary["files_scanned"]
-                eta = max(0, int(remaining * avg))
-                overall_bar.set_postfix_str(f"ETA: {str(timedelta(seconds=eta))}")
+                    summary["errors"].append(res["error"])
+                else:
+                    summary["files_success"] += 1
+                    resume_fh.write(res["file_name"] + "\n")  # basename from the worker
+                    resume_unsynced += 1
+
+                bar_update(1)
+
+                now = monotonic()
+                if resume_unsynced and (resume_unsynced >= RESUME_SYNC_EVERY
+                                        or now - last_resume_sync >= RESUME_SYNC_SECS):
+                    sync_resume(resume_fh)
+                    resume_unsynced = 0
+                    last_resume_sync = now
+
+                # ETA (throttled: every postfix re-renders the bar)
+                if now - last_eta_update >= ETA_REFRESH_SECS:
+                    last_eta_update = now
+                    elapsed = time.time() - summary["start_ts"]
+                    avg = elapsed / max(1, summary["files_scanned"])
+                    remaining = len(pending_files) - summary["files_scanned"]
+                    eta = max(0, int(remaining * avg))
+                    overall_bar.set_postfix_str(f"ETA: {str(timedelta(seconds=eta))}")
 
     finally:
         overall_bar.close()
+        sync_resume(resume_fh)
+        resume_fh.close()
         write_summary(summary)
 
 if __name__ == "__main__":
@@ -12,41 +12,44 @@ INPUT_FOLDER = "input_logs"          # Folder with .txt inputs (non-recursive)
 OUTPUT_FOLDER = "cleaned_output"     # Folder for chunked outputs
 SUMMARY_FILE = "summary_report.txt"  # Saved in current working dir
 RESUME_LOG = "resume_files.log"      # Checkpoint log in current working dir
+ERRORS_LOG = "errors.log"            # Per-file read errors (only created if any)
 MAX_WORKERS = 6                      # Parallel workers
 ALLOWED_EXTS = (".txt",)             # Process only .txt files
 CHUNK_SIZE = 1000                    # Lines per chunk
+WRITE_BUFFER_SIZE = 1 << 20          # Bytes buffered per chunk file before a write() syscall
 # ================================= #
 
 # ---- Global counters ----
 total_lines = 0
 chunks_created = 0
-errors = []
-processed_files = []
+error_count = 0
 
 
 def process_file(file_path: Path):
     """
-    Read one file and return all its lines.
-    This runs in a worker process.
+    Read one file and return its whole content as UTF-8 bytes.
+    This runs in a worker process. One bytes object pickles far cheaper
+    than a list of line strings; the parent splits it back into lines.
     """
     try:
         with file_path.open("r", encoding="utf-8", errors="ignore") as f:
-            lines = f.readlines()
-        return (str(file_path), lines, None)
+            data = f.read().encode("utf-8")
+        return (str(file_path), data, None)
     except Exception as e:
-        return (str(file_path), [], f"{type(e).__name__}: {e}")
+        return (str(file_path), b"", f"{type(e).__name__}: {e}")
 
 
-def write_chunk(lines, chunk_idx, output_dir):
-    """Write one chunk to disk."""
+def open_chunk(chunk_idx, output_dir):
+    """
+    Open the next chunk file for (binary) writing. The large buffer coalesces
+    the many small per-file writes of a run over small inputs.
+    """
     chunk_path = output_dir / f"chunks{chunk_idx:04}.txt"
-    with chunk_path.open("w", encoding="utf-8") as f:
-        f.writelines(lines)
-    return chunk_path
+    return chunk_path.open("wb", buffering=WRITE_BUFFER_SIZE)
 
 
 def main():
-    global total_lines, chunks_created, processed_files, errors
+    global total_lines, chunks_created, error_count
 
     start_ts = time.time()
     input_dir = Path(INPUT_FOLDER)
@@ -59,42 +62,67 @@ def main():
     output_dir.mkdir(parents=True, exist_ok=True)
 
     # Gather files
-    input_files = [p for p in input_dir.iterdir() if p.suffix in ALLOWED_EXTS]
+    with os.scandir(input_dir) as it:
+        input_files = [
+            Path(e.path) for e in it
+            if e.is_file() and os.path.splitext(e.name)[1] in ALLOWED_EXTS
+        ]
     total_files = len(input_files)
     print(f"[INFO] Found {total_files} input files.")
 
-    # ---- Phase 1: Parallel read ----
-    all_lines = []
+    # ---- Parallel read; chunks are written as results arrive ----
+    # Lines go straight into the open chunk file, which is rotated every
+    # CHUNK_SIZE lines (opened lazily, so no empty trailing chunk).
+    chunk_fh = None
+    chunk_lines = 0
+    chunk_idx = 1
+    errors_fh = None  # errors are streamed out, not kept in memory
+    # Each file is logged once its lines are handed to the chunk writer
+    # (line-buffered), so a run that dies midway still leaves its log behind
+    resume_fh = open(RESUME_LOG, "w", encoding="utf-8", buffering=1)
     with ProcessPoolExecutor(max_workers=MAX_WORKERS) as pool:
         futures = {pool.submit(process_file, p): p for p in input_files}
         for i, fut in enumerate(as_completed(futures), 1):
-            file_path, lines, err = fut.result()
+            file_path, data, err = fut.result()
+            # Text mode already turned every \r / \r\n into \n, so this splits
+            # exactly like readlines() (a final line may lack its \n)
+            lines = data.splitlines(keepends=True)
             if err:
                 print(f"[ERROR] {file_path} -> {err}")
-                errors.append(f"{file_path} -> {err}")
+                if errors_fh is None:
+                    errors_fh = open(ERRORS_LOG, "w", encoding="utf-8")
+                errors_fh.write(f"{file_path} -> {err}\n")
+                error_count += 1
             else:
                 print(f"[READ] {file_path} ({len(lines)} lines)")
-                all_lines.extend(lines)
-                processed_files.append(file_path)
                 total_lines += len(lines)
+
+                pos = 0
+                while pos < len(lines):
+                    if chunk_fh is None:
+                        chunk_fh = open_chunk(chunk_idx, output_dir)
+                    take = CHUNK_SIZE - chunk_lines
+                    part = lines[pos:pos + take]
+                    chunk_fh.write(b"".join(part))
+                    chunk_lines += len(part)
+                    pos += take
+                    if chunk_lines == CHUNK_SIZE:
+                        chunk_fh.close()
+                        chunk_fh = None
+                        chunks_created += 1
+                        chunk_idx += 1
+                        chunk_lines = 0
+                resume_fh.write(f"{file_path}\n")
             if i % 10 == 0 or i == total_files:
                 print(f"[STATUS] Reading {i}/{total_files} done...")
 
-    # ---- Phase 2: Chunk writing ----
-    buffer = []
-    chunk_idx = 1
-    for line in all_lines:
-        buffer.append(line)
-        if len(buffer) == CHUNK_SIZE:
-            write_chunk(buffer, chunk_idx, output_dir)
-            chunks_created += 1
-            chunk_idx += 1
-            buffer = []
-
-    # Write leftovers
-    if buffer:
-        write_chunk(buffer, chunk_idx, output_dir)
+    # Close the partial last chunk
+    if chunk_fh is not None:
+        chunk_fh.close()
         chunks_created += 1
+    if errors_fh is not None:
+        errors_fh.close()
+    resume_fh.close()
 
     elapsed = time.time() - start_ts
 
@@ -108,15 +136,8 @@ def main():
         f.write(f"Total lines    : {total_lines}\n")
         f.write(f"Chunks created : {chunks_created}\n")
         f.write(f"Elapsed (sec)  : {elapsed:.2f}\n")
-        if errors:
-            f.write("\nErrors:\n")
-            for e in errors:
-                f.write(f"- {e}\n")
-
-    # ---- Resume log ----
-    with open(RESUME_LOG, "w", encoding="utf-8") as f:
-        for pf in processed_files:
-            f.write(f"{pf}\n")
+        if error_count:
+            f.write(f"\nErrors         : {error_count} (see {ERRORS_LOG})\n")
 
     print("------------------------------------")
     print(f"[DONE] Files: {total_files} | Lines: {total_lines:,} | Chunks: {chunks_created:,}")
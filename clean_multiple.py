@@ -3,7 +3,9 @@ import sys
 import time
 import re
 import traceback
-from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing as mp
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime, timedelta
 from tqdm import tqdm
 
@@ -14,6 +16,11 @@ SUMMARY_FILE = "summary_report.txt" # Saved in current working dir
 RESUME_LOG = "resume_files.log"     # Checkpoint log in current working dir
 MAX_WORKERS = 6                     # Use 6–8 for optimal performance
 ALLOWED_EXTS = (".txt",)            # Process only .txt files
+READ_BLOCK_SIZE = 4 << 20           # Bytes read (and screened for markers) per block
+RESUME_FLUSH_EVERY = 64             # Flush the resume log after this many new entries
+FILES_PER_TASK = 32                 # Max files handed to a worker per submitted task
+MAX_IN_FLIGHT = MAX_WORKERS * 4     # Max tasks queued in the pool at any time
+PIN_WORKERS = False                 # Pin each worker to its own CPU (Linux only)
 
 # Multiple markers: remove a line if it contains ANY of these
 # (If USE_REGEX=False, these are treated as LITERAL substrings)
@@ -37,6 +44,53 @@ if USE_REGEX:
 else:
     MARKER_OBJS = [m.lower() if CASE_INSENSITIVE else m for m in MARKERS]
 
+def _build_any_marker_search():
+    """
+    One alternation over all markers, so a line with no hit (the usual case)
+    costs a single C-level search. Returns its bound .search, or None when the
+    regex markers cannot be safely combined (groups/backrefs, global flags).
+    """
+    if not USE_REGEX:
+        lits = [re.escape(lit) for lit in MARKER_OBJS if lit]
+        return re.compile("|".join(lits) if lits else r"(?!)").search
+    if any(rx.groups for rx in MARKER_OBJS):
+        return None  # numbered groups / backrefs would shift once combined
+    try:
+        return re.compile("|".join(f"(?:{p})" for p in MARKERS), _marker_flags).search
+    except re.error:
+        return None
+_any_marker_search = _build_any_marker_search()
+
+# Literal markers as UTF-8 bytes, searched straight in the raw blocks (empty
+# ones never hit). A UTF-8 substring match is exactly a str substring match.
+MARKER_B = [] if USE_REGEX else [m.encode("utf-8") for m in MARKER_OBJS if m]
+_any_marker_search_b = re.compile(
+    b"|".join(re.escape(mb) for mb in MARKER_B) if MARKER_B else rb"(?!)"
+).search
+
+# The only non-ASCII characters whose lower() contains ASCII: U+0130 ('İ' -> 'i̇')
+# and U+212A (KELVIN SIGN -> 'k'). Without them, ASCII-only markers hit the same
+# in bytes.lower() (ASCII letters only) as in str.lower(), so no decode is needed.
+_LOWER_TO_ASCII_B = ("\u0130".encode("utf-8"), "\u212a".encode("utf-8"))
+_ASCII_MARKERS = all(mb.isascii() for mb in MARKER_B)
+
+def _build_first_bytes():
+    """
+    Every byte a case-insensitive literal hit can start at (both cases of each
+    marker's first byte, plus the lead bytes of U+0130 / U+212A when they lower
+    to it). A block holding none of them cannot hit, so it skips the lower()
+    copy. None when not exact here (regex, case-sensitive or non-ASCII markers).
+    """
+    if USE_REGEX or not CASE_INSENSITIVE or not _ASCII_MARKERS:
+        return None
+    firsts = {mb[:1] for mb in MARKER_B}
+    firsts |= {f.upper() for f in firsts}
+    for folded, lead in zip((b"i", b"k"), _LOWER_TO_ASCII_B):
+        if folded in firsts:
+            firsts.add(lead[:1])
+    return tuple(firsts)
+_FIRST_BYTES = _build_first_bytes()
+
 # [CustomerId: ...] finder — preserves exact inner text
 _CUST_FLAGS = 0 if CUSTOMER_ID_CASE_SENSITIVE else re.IGNORECASE
 CUST_RE = re.compile(r"\[CustomerId:(.*?)\]", _CUST_FLAGS)
@@ -45,16 +99,55 @@ def _line_hits_any_marker(line: str) -> (bool, list):
     """Return (hit, hit_indexes). hit_indexes are indices into MARKERS for which a hit occurred."""
     hits = []
     if USE_REGEX:
+        if _any_marker_search is not None and not _any_marker_search(line):
+            return (False, hits)
         for i, rx in enumerate(MARKER_OBJS):
             if rx.search(line):
                 hits.append(i)
     else:
         hay = line.lower() if CASE_INSENSITIVE else line
+        if not _any_marker_search(hay):
+            return (False, hits)
+        # a hit: the per-marker pass finds every marker present (overlaps included)
         for i, lit in enumerate(MARKER_OBJS):
             if lit and (lit in hay):
                 hits.append(i)
     return (len(hits) > 0, hits)
 
+def _marker_hay_b(block: bytes):
+    """
+    The bytes to search a raw block for literal markers, position-aligned with
+    the block, or None when only the decoded path is exact (regex markers, or
+    a case-insensitive block that bytes.lower() cannot fold like str.lower()).
+    """
+    if USE_REGEX:
+        return None
+    if not CASE_INSENSITIVE:
+        return block
+    # same per-line result as line.lower() (see _LOWER_TO_ASCII_B)
+    if block.isascii() or (_ASCII_MARKERS and not any(c in block for c in _LOWER_TO_ASCII_B)):
+        return block.lower()
+    return None
+
+def _normalize_block(region: bytes) -> bytes:
+    """
+    Make a block of whole lines byte-identical to what text mode would have
+    produced: invalid UTF-8 dropped (errors="ignore") and '\\r\\n' / lone '\\r'
+    turned into '\\n'. Valid UTF-8 without '\\r' (the usual case) is returned as-is.
+    """
+    if b"\r" not in region:
+        if region.isascii():
+            return region
+        try:
+            region.decode("utf-8")  # validate only; no re-encode needed
+            return region
+        except UnicodeDecodeError:
+            pass
+    text = region.decode("utf-8", "ignore")
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text.encode("utf-8")
+
 def _salvage_from_first_semicolon(line_wo_nl: str, keep_bracket: str) -> str:
     """
     Build salvaged line: [CustomerId: ...] + ' ' + substring from the first ';' (inclusive) to end.
@@ -69,6 +162,101 @@ def _salvage_from_first_semicolon(line_wo_nl: str, keep_bracket: str) -> str:
     else:
         return keep_bracket + tail
 
+def _clean_line(base: str, local: dict):
+    """
+    Apply the marker / CustomerId rules to one line (without its newline).
+    Returns the line to write (as-is or salvaged), or None to drop it;
+    hit / removed / salvaged counts go into `local`.
+    """
+    hit, idxs = _line_hits_any_marker(base)
+    if not hit:
+        # no marker -> keep as-is
+        return base
+
+    # Count marker hits (even if we end up salvaging)
+    for i in idxs:
+        local["per_marker_hits"][i] += 1
+
+    # Look for the first NON-empty CustomerId bracket; stop scanning there
+    for m in CUST_RE.finditer(base):
+        inner = m.group(1)  # content after colon up to closing ']'
+        if inner and not inner.isspace():
+            keep_token = m.group(0)  # preserve exact bracket text
+            local["lines_salvaged"] += 1
+            return _salvage_from_first_semicolon(base, keep_token)
+
+    # No CustomerId, or only empty ones -> drop
+    local["lines_removed"] += 1
+    return None
+
+def _clean_block(text: str, local: dict) -> str:
+    """
+    Apply the line rules to a decoded block of whole lines; returns the text to
+    write. Literal markers are located by searching the whole block, so only
+    the lines they land on go through _clean_line; the rest is copied in slices.
+    """
+    hay = text.lower() if CASE_INSENSITIVE and not USE_REGEX else text
+    if USE_REGEX or len(hay) != len(text):
+        # Regex markers may be anchored to the line; a lower() that changed
+        # lengths no longer lines up with text. Go line by line instead.
+        lines = text.split("\n")
+        partial = lines.pop()  # "" unless this is a final line without '\n'
+        kept = [out for out in (_clean_line(base, local) for base in lines) if out is not None]
+        out = "\n".join(kept) + "\n" if kept else ""
+        if partial:
+            last = _clean_line(partial, local)
+            if last is not None:
+                out += last
+        return out
+
+    search = _any_marker_search
+    m = search(hay)
+    if m is None:
+        return text
+    parts = []
+    pos = 0  # start of the first line not yet copied or cleaned
+    while m is not None:
+        start = text.rfind("\n", 0, m.start()) + 1
+        end = text.find("\n", m.start())
+        if end < 0:
+            end = len(text)  # final line without '\n'
+        parts.append(text[pos:start])
+        line = _clean_line(text[start:end], local)
+        if line is not None:
+            parts.append(line)
+            parts.append(text[end:end + 1])  # its '\n', if any
+        pos = end + 1
+        m = search(hay, pos)
+    parts.append(text[pos:])
+    return "".join(parts)
+
+def _clean_block_b(block: bytes, hay: bytes, local: dict) -> bytes:
+    """
+    Bytes twin of _clean_block for a raw block and its marker hay (see
+    _marker_hay_b). Only the lines a marker lands on are decoded for
+    _clean_line; a block without a hit is returned as-is.
+    """
+    search = _any_marker_search_b
+    m = search(hay)
+    if m is None:
+        return block
+    parts = []
+    pos = 0  # start of the first line not yet copied or cleaned
+    while m is not None:
+        start = block.rfind(b"\n", 0, m.start()) + 1
+        end = block.find(b"\n", m.start())
+        if end < 0:
+            end = len(block)  # final line without '\n'
+        parts.append(block[pos:start])
+        line = _clean_line(block[start:end].decode("utf-8"), local)
+        if line is not None:
+            parts.append(line.encode("utf-8"))
+            parts.append(block[end:end + 1])  # its '\n', if any
+        pos = end + 1
+        m = search(hay, pos)
+    parts.append(block[pos:])
+    return b"".join(parts)
+
 def process_file(file_path: str) -> dict:
     """
     Removes any line that matches ANY marker, with CustomerId salvage rules:
@@ -96,49 +284,43 @@ def process_file(file_path: str) -> dict:
         pass
 
     try:
-        with open(file_path, "r", encoding="utf-8", errors="ignore") as f_in, \
-             open(out_path, "w", encoding="utf-8") as f_out:
-
-            for raw in f_in:
-                local["lines_processed"] += 1
-                has_nl = raw.endswith("\n")
-                base = raw[:-1] if has_nl else raw
-
-                hit, idxs = _line_hits_any_marker(base)
-                if not hit:
-                    # no marker -> keep as-is
-                    f_out.write(raw)
+        with open(file_path, "rb") as f_in, open(out_path, "wb") as f_out:
+            tail = b""  # partial last line carried into the next block
+            while True:
+                chunk = f_in.read(READ_BLOCK_SIZE)
+                if chunk:
+                    buf = tail + chunk
+                    cut = buf.rfind(b"\n") + 1
+                    if not cut:
+                        tail = buf
+                        continue
+                    block, tail = buf[:cut], buf[cut:]
+                elif tail:
+                    block, tail = tail, b""  # final line without a newline
+                else:
+                    break
+
+                block = _normalize_block(block)
+                if not block:
                     continue
 
-                # Count marker hits (even if we end up salvaging)
-                for i in idxs:
-                    local["per_marker_hits"][i] += 1
+                local["lines_processed"] += block.count(b"\n") + (not block.endswith(b"\n"))
 
-                # Look for CustomerId brackets
-                matches = list(CUST_RE.finditer(base))
-                if not matches:
-                    # No CustomerId -> drop
-                    local["lines_removed"] += 1
+                # No marker can start anywhere in the block: nothing to fold
+                if _FIRST_BYTES is not None and not any(fb in block for fb in _FIRST_BYTES):
+                    f_out.write(block)
                     continue
 
-                # Prefer first NON-empty CustomerId; otherwise treat as empty
-                nonempty = None
-                empty_present = False
-                for m in matches:
-                    inner = m.group(1)  # content after colon up to closing ']'
-                    if inner.strip() == "":
-                        empty_present = True
-                    elif nonempty is None:
-                        nonempty = m
-
-                if nonempty is not None:
-                    keep_token = nonempty.group(0)  # preserve exact bracket text
-                    salvaged = _salvage_from_first_semicolon(base, keep_token)
-                    f_out.write(salvaged + ("\n" if has_nl else ""))
-                    local["lines_salvaged"] += 1
-                else:
-                    # only empty CustomerId present -> drop
-                    local["lines_removed"] += 1
+                # Literal markers are found in the raw bytes; a block without
+                # a hit is written back as-is, never split or decoded
+                hay = _marker_hay_b(block)
+                if hay is not None:
+                    f_out.write(_clean_block_b(block, hay, local))
+                    continue
+
+                text = block.decode("utf-8")
+                out = _clean_block(text, local)
+                f_out.write(block if out is text else out.encode("utf-8"))
 
     except Exception as e:
         # Remove partial output so the file is retried next run
@@ -153,6 +335,35 @@ def process_file(file_path: str) -> dict:
 
     return local
 
+def _pin_worker(cpus: list, next_slot):
+    """Pool initializer: pin this worker to the next CPU in turn (round-robin)."""
+    with next_slot.get_lock():
+        slot = next_slot.value
+        next_slot.value += 1
+    try:
+        os.sched_setaffinity(0, {cpus[slot % len(cpus)]})
+    except OSError:
+        pass  # CPU went away / not permitted: stay unpinned
+
+def process_files(batch: list) -> list:
+    """Runs process_file over a batch of paths in one task (one IPC round-trip)."""
+    return [process_file(fp) for fp in batch]
+
+def iter_completed(ex, fn, tasks, max_in_flight: int):
+    """
+    Yields (task, future) as futures finish, keeping at most max_in_flight
+    submitted; a new task is submitted each time one completes.
+    """
+    tasks = iter(tasks)
+    futures = {ex.submit(fn, t): t for t in islice(tasks, max_in_flight)}
+    while futures:
+        done, _ = wait(futures, return_when=FIRST_COMPLETED)
+        for fut in done:
+            task = futures.pop(fut)
+            for nxt in islice(tasks, 1):
+                futures[ex.submit(fn, nxt)] = nxt
+            yield task, fut
+
 def load_completed_set(log_path: str) -> set:
     """Loads a set of completed files from the resume log."""
     completed = set()
@@ -164,44 +375,39 @@ def load_completed_set(log_path: str) -> set:
                     completed.add(name)
     return completed
 
-def append_completed(log_path: str, file_name: str):
-    """Appends a completed file name to the resume log."""
-    with open(log_path, "a", encoding="utf-8") as f:
-        f.write(file_name + "\n")
-
 def write_summary(summary_data):
-    """Writes the summary report to a file."""
+    """Writes the summary report to a file (built in memory, one write)."""
     summary_data["end_ts"] = time.time()
+    parts = [
+        f"Line Filter + CustomerId Salvage (;tail) - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n",
+        f"Input Folder: {os.path.abspath(INPUT_FOLDER)}\n",
+        f"Output Folder: {os.path.abspath(OUTPUT_FOLDER)}\n",
+        f"Max Workers: {summary_data['max_workers']}\n",
+        f"Use regex: {USE_REGEX} | Case-insensitive: {CASE_INSENSITIVE}\n",
+        f"CustomerId case-sensitive: {CUSTOMER_ID_CASE_SENSITIVE}\n",
+        "Markers:\n",
+    ]
+    parts += [f"  {i+1}. {m!r}\n" for i, m in enumerate(MARKERS)]
+    parts += [
+        "\n",
+        "=== Files Processed ===\n",
+        f"Processed: {summary_data['files_scanned']}\n",
+        f"Success:   {summary_data['files_success']}\n",
+        f"Errors:    {summary_data['files_error']}\n\n",
+        "=== Lines ===\n",
+        f"Total lines processed: {summary_data['total_lines_processed']}\n",
+        f"Total lines removed:   {summary_data['total_lines_removed']}\n",
+        f"Total lines salvaged:  {summary_data['total_lines_salvaged']}\n\n",
+        "Per-marker hits (line may increment multiple markers):\n",
+    ]
+    parts += [f"  {i+1}. {m!r}: {summary_data['per_marker_hits'][i]}\n" for i, m in enumerate(MARKERS)]
+
+    if summary_data["errors"]:
+        parts.append("\n=== Errors ===\n")
+        parts += [f"- {err}\n" for err in summary_data["errors"]]
+
     with open(SUMMARY_FILE, "w", encoding="utf-8") as f:
-        f.write(f"Line Filter + CustomerId Salvage (;tail) - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        f.write(f"Input Folder: {os.path.abspath(INPUT_FOLDER)}\n")
-        f.write(f"Output Folder: {os.path.abspath(OUTPUT_FOLDER)}\n")
-        f.write(f"Max Workers: {summary_data['max_workers']}\n")
-        f.write(f"Use regex: {USE_REGEX} | Case-insensitive: {CASE_INSENSITIVE}\n")
-        f.write(f"CustomerId case-sensitive: {CUSTOMER_ID_CASE_SENSITIVE}\n")
-        f.write("Markers:\n")
-        for i, m in enumerate(MARKERS):
-            f.write(f"  {i+1}. {m!r}\n")
-        f.write("\n")
-
-        f.write("=== Files Processed ===\n")
-        f.write(f"Processed: {summary_data['files_scanned']}\n")
-        f.write(f"Success:   {summary_data['files_success']}\n")
-        f.write(f"Errors:    {summary_data['files_error']}\n\n")
-
-        f.write("=== Lines ===\n")
-        f.write(f"Total lines processed: {summary_data['total_lines_processed']}\n")
-        f.write(f"Total lines removed:   {summary_data['total_lines_removed']}\n")
-        f.write(f"Total lines salvaged:  {summary_data['total_lines_salvaged']}\n\n")
-
-        f.write("Per-marker hits (line may increment multiple markers):\n")
-        for i, m in enumerate(MARKERS):
-            f.write(f"  {i+1}. {m!r}: {summary_data['per_marker_hits'][i]}\n")
-
-        if summary_data["errors"]:
-            f.write("\n=== Errors ===\n")
-            for err in summary_data["errors"]:
-                f.write(f"- {err}\n")
+        f.write("".join(parts))
 
 def main():
     if not os.path.isdir(INPUT_FOLDER):
@@ -210,12 +416,11 @@ def main():
 
     os.makedirs(OUTPUT_FOLDER, exist_ok=True)
 
-    all_files = sorted(
-        os.path.join(INPUT_FOLDER, f)
-        for f in os.listdir(INPUT_FOLDER)
-        if os.path.isfile(os.path.join(INPUT_FOLDER, f))
-        and os.path.splitext(f)[1].lower() in ALLOWED_EXTS
-    )
+    with os.scandir(INPUT_FOLDER) as it:
+        all_files = sorted(
+            e.path for e in it
+            if e.is_file() and os.path.splitext(e.name)[1].lower() in ALLOWED_EXTS
+        )
 
     if not all_files:
         print(f"No {ALLOWED_EXTS} files found in INPUT_FOLDER.", file=sys.stderr)
@@ -243,18 +448,47 @@ def main():
     }
 
     overall_bar = tqdm(total=len(pending_files), desc="Overall", unit="file", leave=True)
+    # One buffered handle for the whole run, flushed in batches; a crash loses
+    # at most a batch of entries, and those files are simply redone next run
+    resume_fh = open(RESUME_LOG, "a", encoding="utf-8")
+    resume_unflushed = 0
 
     try:
-        with ProcessPoolExecutor(max_workers=MAX_WORKERS) as ex:
-            futures = {ex.submit(process_file, fp): fp for fp in pending_files}
-
-            for fut in as_completed(futures):
-                file_path = futures[fut]
-                base_name = os.path.basename(file_path)
-
+        # fork: workers inherit the marker patterns, the combined marker search and
+        # CUST_RE already compiled at import instead of re-importing this module
+        # (spawn/forkserver). Linux only; others keep the default
+        ctx = mp.get_context("fork") if sys.platform.startswith("linux") else None
+        pool_kwargs = {}
+        if PIN_WORKERS and hasattr(os, "sched_setaffinity"):
+            # only the CPUs this process may run on; a shared counter hands
+            # each worker a distinct one
+            cpus = sorted(os.sched_getaffinity(0))
+            pool_kwargs = {"initializer": _pin_worker,
+                           "initargs": (cpus, (ctx or mp).Value("i", 0))}
+        with ProcessPoolExecutor(max_workers=MAX_WORKERS, mp_context=ctx, **pool_kwargs) as ex:
+            # Cap the batch so every worker still gets several tasks on small runs
+            per_task = max(1, min(FILES_PER_TASK, len(pending_files) // (MAX_WORKERS * 4)))
+            batches = (pending_files[i:i + per_task]
+                       for i in range(0, len(pending_files), per_task))
+
+            for batch, fut in iter_completed(ex, process_files, batches, MAX_IN_FLIGHT):
                 try:
-                    res = fut.result()
+                    batch_results = fut.result()
+                    batch_error = None
+                except Exception as e:
+                    batch_results = [None] * len(batch)
+                    batch_error = e
+
+                for file_path, res in zip(batch, batch_results):
+                    base_name = os.path.basename(file_path)
                     summary["files_scanned"] += 1
+
+                    if batch_error is not None:
+                        summary["files_error"] += 1
+                        summary["errors"].append(f"{base_name}: worker exception: {batch_error}")
+                        overall_bar.update(1)
+                        continue
+
                     summary["total_lines_processed"] += res["lines_processed"]
                     summary["total_lines_removed"] += res["lines_removed"]
                     summary["total_lines_salvaged"] += res["lines_salvaged"]
@@ -272,14 +506,13 @@ def main():
                         summary["errors"].append(res["error"])
                     else:
                         summary["files_success"] += 1
-                        append_completed(RESUME_LOG, base_name)
-
-                except Exception as e:
-                    summary["files_scanned"] += 1
-                    summary["files_error"] += 1
-                    summary["errors"].append(f"{base_name}: worker exception: {e}")
+                        resume_fh.write(base_name + "\n")
+                        resume_unflushed += 1
+                        if resume_unflushed >= RESUME_FLUSH_EVERY:
+                            resume_fh.flush()
+                            resume_unflushed = 0
 
-                overall_bar.update(1)
+                    overall_bar.update(1)
 
                 # ETA
                 if summary["files_scanned"] > 0:
@@ -291,6 +524,7 @@ def main():
 
     finally:
         overall_bar.close()
+        resume_fh.close()
         write_summary(summary)
 
 if __name__ == "__main__":
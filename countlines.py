@@ -1,27 +1,59 @@
 #!/usr/bin/env python3
 import argparse
+import codecs
 import csv
 import sys
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import Tuple, List
 
 MAX_WORKERS = 6
+READ_BUFFER_SIZE = 1 << 20  # bytes read (and counted) per chunk
 
 def count_lines_in_file(path: Path) -> Tuple[str, int]:
     """
-    Count the number of lines in a text file.
-    Uses text mode so a final line without a trailing newline is still counted.
+    Count the number of lines in a text file, exactly as text mode would split
+    it ('\\n', '\\r\\n' and a lone '\\r' each end a line; a final line without
+    one is still counted). Works on raw byte chunks with bytes.count; only the
+    text after the last break, or a chunk holding a '\\r', is ever decoded.
     """
     count = 0
+    prev_cr = False  # last decoded chunk ended with '\r'
+    tail_has_text = False  # text after the last line break so far
+    # decodes like text mode (errors="ignore"), carrying split characters across chunks
+    decoder = codecs.getincrementaldecoder("utf-8")("ignore")
     try:
-        with path.open("r", encoding="utf-8", errors="ignore") as f:
-            for _ in f:
-                count += 1
+        with path.open("rb") as f:
+            while True:
+                buf = f.read(READ_BUFFER_SIZE)
+                if not buf:
+                    break
+                if not prev_cr and b"\r" not in buf:
+                    # only '\n' breaks, and decoding never adds or drops one
+                    count += buf.count(b"\n")
+                    cut = buf.rfind(b"\n") + 1
+                    if cut:
+                        decoder.reset()  # whatever was pending ended before this '\n'
+                        tail_has_text = decoder.decode(buf[cut:]) != ""
+                    elif not tail_has_text:
+                        tail_has_text = decoder.decode(buf) != ""
+                    continue
+
+                # Invalid bytes are dropped *before* newlines are translated, so
+                # b"\r\xff\n" is a single '\r\n' break: count on the decoded text
+                text = decoder.decode(buf)
+                if not text:
+                    continue
+                count += text.count("\n") + text.count("\r") - text.count("\r\n")
+                if prev_cr and text[0] == "\n":
+                    count -= 1  # a '\r\n' split across two chunks is one break
+                prev_cr = text[-1] == "\r"
+                cut = max(text.rfind("\n"), text.rfind("\r")) + 1
+                tail_has_text = cut < len(text) or (tail_has_text and not cut)
     except Exception:
         # Return -1 to indicate an error; caller can handle/report it.
         return (str(path), -1)
-    return (str(path), count)
+    return (str(path), count + tail_has_text)
 
 def find_txt_files(root: Path, recursive: bool = True) -> List[Path]:
     return sorted(root.rglob("*.txt") if recursive else root.glob("*.txt"))
@@ -51,11 +83,11 @@ def main():
     results: List[Tuple[str, int]] = []
     errors = 0
 
-    # Use ProcessPoolExecutor for parallel counting
+    # Use ProcessPoolExecutor for parallel counting. Counting a file is cheap,
+    # so files go to workers in chunks (one IPC round-trip per chunk)
+    chunksize = max(1, len(files) // (MAX_WORKERS * 4))
     with ProcessPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        future_map = {executor.submit(count_lines_in_file, p): p for p in files}
-        for fut in as_completed(future_map):
-            fname, line_count = fut.result()
+        for fname, line_count in executor.map(count_lines_in_file, files, chunksize=chunksize):
             results.append((fname, line_count))
             if line_count < 0:
                 errors += 1
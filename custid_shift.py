@@ -3,9 +3,11 @@ import os
 import re
 import sys
 import time
+import multiprocessing as mp
+from itertools import islice
 from datetime import datetime, timedelta
 from functools import lru_cache
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 from tqdm import tqdm
 from collections import Counter
 
@@ -17,6 +19,10 @@ SUMMARY_FILE = "summary_report.txt"  # Saved in current working dir
 RESUME_LOG = "resume_files.log"      # Checkpoint log in current working dir
 MAX_WORKERS = 6                      # Parallel workers
 ALLOWED_EXTS = (".txt",)             # Process only .txt files
+FILES_PER_TASK = 32                  # Max files handed to a worker per submitted task
+MAX_IN_FLIGHT = MAX_WORKERS * 4      # Max tasks queued in the pool at any time
+IO_BUFFER_SIZE = 1 << 20             # Bytes buffered per input/output file (default is 8 KiB)
+AADHAAR_CACHE_SIZE = 1 << 16         # Verhoeff results cached per worker (~10 MB at this size)
 # ================================= #
 
 # ---------- REGEX PATTERNS ----------
@@ -50,40 +56,53 @@ PII_PATTERNS = {
 }
 
 # ---------- Aadhaar Verhoeff ----------
-@lru_cache(maxsize=10000)
+# Tables built once at import, not on every call
+_VERHOEFF_MUL = (
+    (0,1,2,3,4,5,6,7,8,9),
+    (1,2,3,4,0,6,7,8,9,5),
+    (2,3,4,0,1,7,8,9,5,6),
+    (3,4,0,1,2,8,9,5,6,7),
+    (4,0,1,2,3,9,5,6,7,8),
+    (5,9,8,7,6,0,4,3,2,1),
+    (6,5,9,8,7,1,0,4,3,2),
+    (7,6,5,9,8,2,1,0,4,3),
+    (8,7,6,5,9,3,2,1,0,4),
+    (9,8,7,6,5,4,3,2,1,0),
+)
+_VERHOEFF_PERM = (
+    (0,1,2,3,4,5,6,7,8,9),
+    (1,5,7,6,2,8,3,0,9,4),
+    (5,8,0,3,7,9,6,1,4,2),
+    (8,9,1,6,0,4,3,5,2,7),
+    (9,4,5,3,1,2,6,8,7,0),
+    (4,2,8,6,5,7,3,9,0,1),
+    (2,7,9,3,8,0,6,4,1,5),
+    (7,0,4,6,9,1,3,2,5,8),
+)
+_VERHOEFF_INV = (0,4,3,2,1,5,6,7,8,9)
+# perm row of each of the 12 digit positions, counted from the right
+_VERHOEFF_PERM_AT = tuple(_VERHOEFF_PERM[i % 8] for i in range(12))
+
+@lru_cache(maxsize=AADHAAR_CACHE_SIZE)
 def is_valid_aadhaar(number: str) -> bool:
     if len(number) != 12 or not number.isdigit():
         return False
-    mul = [
-        [0,1,2,3,4,5,6,7,8,9],
-        [1,2,3,4,0,6,7,8,9,5],
-        [2,3,4,0,1,7,8,9,5,6],
-        [3,4,0,1,2,8,9,5,6,7],
-        [4,0,1,2,3,9,5,6,7,8],
-        [5,9,8,7,6,0,4,3,2,1],
-        [6,5,9,8,7,1,0,4,3,2],
-        [7,6,5,9,8,2,1,0,4,3],
-        [8,7,6,5,9,3,2,1,0,4],
-        [9,8,7,6,5,4,3,2,1,0]
-    ]
-    perm = [
-        [0,1,2,3,4,5,6,7,8,9],
-        [1,5,7,6,2,8,3,0,9,4],
-        [5,8,0,3,7,9,6,1,4,2],
-        [8,9,1,6,0,4,3,5,2,7],
-        [9,4,5,3,1,2,6,8,7,0],
-        [4,2,8,6,5,7,3,9,0,1],
-        [2,7,9,3,8,0,6,4,1,5],
-        [7,0,4,6,9,1,3,2,5,8]
-    ]
-    inv = [0,4,3,2,1,5,6,7,8,9]
+    mul = _VERHOEFF_MUL
     c = 0
-    for i, ch in enumerate(reversed(number)):
-        c = mul[c][perm[i % 8][int(ch)]]
-    return inv[c] == 0
+    for perm, ch in zip(_VERHOEFF_PERM_AT, reversed(number)):
+        c = mul[c][perm[int(ch)]]
+    return _VERHOEFF_INV[c] == 0
 
 # ---------- Card Luhn ----------
+# Luhn doubling of one ASCII digit (2d, less 9 past 9), digit to digit
+_LUHN_DOUBLE = bytes.maketrans(b"0123456789", b"0246813579")
+
 def _luhn_valid(num: str) -> bool:
+    if num.isascii() and num.isdigit():
+        # digit sums in C: the rightmost digit and every other one as-is,
+        # the rest doubled through the table (48 = ord("0") per digit)
+        b = num.encode("ascii")
+        return (sum(b[-1::-2]) + sum(b[-2::-2].translate(_LUHN_DOUBLE)) - 48 * len(b)) % 10 == 0
     s, alt = 0, False
     for ch in reversed(num):
         if not ch.isdigit():
@@ -117,6 +136,54 @@ for k, phrases in KEYWORD_PHRASES.items():
         compiled.append(re.compile(pat, re.IGNORECASE))
     KEYWORD_REGEXES[k] = compiled
 
+# First word of each phrase, lowercased, in KEYWORD_REGEXES order. An ASCII
+# line can only match a phrase if line.lower() contains it (no Unicode case
+# folding into ASCII to worry about), which is far cheaper than the regex.
+KEYWORD_LEADS = {k: [p.split()[0].lower() for p in phrases] for k, phrases in KEYWORD_PHRASES.items()}
+
+# ---------- Combined gates ----------
+# One search per family: a line none of the patterns match (the usual case)
+# costs a single scan instead of one per pattern. Only a gate; hits are still
+# found and counted per pattern. The shared left boundary is tested once per
+# position, ahead of the alternation, which prunes most positions early.
+_WORD_START = r'(?<![A-Za-z0-9])'
+
+def _build_any_pii_search():
+    shared, rest = [], []
+    for rx in PII_PATTERNS.values():
+        pat = rx.pattern
+        bucket = shared if pat.startswith(_WORD_START) else rest
+        if bucket is shared:
+            pat = pat[len(_WORD_START):]
+        bucket.append(f"(?i:{pat})" if rx.flags & re.IGNORECASE else f"(?:{pat})")
+    alts = ([_WORD_START + "(?:" + "|".join(shared) + ")"] if shared else []) + rest
+    return re.compile("|".join(alts)).search
+
+_ANY_PII_SEARCH = _build_any_pii_search()
+_ANY_KEYWORD_SEARCH = re.compile(
+    _WORD_START + "(?:" + "|".join(
+        re.escape(p).replace(r"\ ", r"[ _-]+") for phrases in KEYWORD_PHRASES.values() for p in phrases
+    ) + r")(?![A-Za-z0-9])",
+    re.IGNORECASE,
+).search
+
+# Digit shapes the numeric patterns cannot match without. On a line the gate
+# passed, each is checked once and a pattern whose shape is absent is skipped.
+_DIGIT_RUN_10 = re.compile(r"\d{10}").search  # MOBILE, AADHAAR, DL, CARD
+_DIGIT_RUN_4 = re.compile(r"\d{4}").search    # PAN, VOTERID, GSTIN
+_DIGIT_DOT = re.compile(r"\d\.").search       # IP, COORD (first number)
+PII_PREFILTERS = {
+    "MOBILE_REGEX": _DIGIT_RUN_10,
+    "AADHAAR_REGEX": _DIGIT_RUN_10,
+    "DL_REGEX": _DIGIT_RUN_10,
+    "CARD_REGEX": _DIGIT_RUN_10,
+    "PAN_REGEX": _DIGIT_RUN_4,
+    "VOTERID_REGEX": _DIGIT_RUN_4,
+    "GSTIN_REGEX": _DIGIT_RUN_4,
+    "IP_REGEX": _DIGIT_DOT,
+    "COORD_REGEX": _DIGIT_DOT,
+}
+
 # ---------- CustomerId regex ----------
 CUSTID_RE = re.compile(r"\[CustomerId:(.*?)\]")
 
@@ -131,16 +198,16 @@ def process_file(file_path: str) -> dict:
         "custid_mobile_only": 0,
         "regex_counts": Counter(),
         "keyword_counts": Counter(),
-        "custid_values": [],
+        "custid_values": set(),  # distinct moved ids; custid_moved has the total
         "custid_lines": [],
         "error": None,
     }
 
-    out_path = os.path.join(OUTPUT_FOLDER, os.path.basename(file_path))
+    out_path = os.path.join(OUTPUT_FOLDER, local["file_name"])
 
     try:
-        with open(file_path, "r", encoding="utf-8", errors="ignore") as f_in, \
-             open(out_path, "w", encoding="utf-8") as f_out:
+        with open(file_path, "r", encoding="utf-8", errors="ignore", buffering=IO_BUFFER_SIZE) as f_in, \
+             open(out_path, "w", encoding="utf-8", buffering=IO_BUFFER_SIZE) as f_out:
 
             for raw in f_in:
                 local["lines_processed"] += 1
@@ -155,24 +222,41 @@ def process_file(file_path: str) -> dict:
                 # --- Regex matches ---
                 regex_hit = False
                 regex_names = []
-                for name, rx in PII_PATTERNS.items():
-                    for m in rx.finditer(line):
-                        val = m.group(0)
-                        if name == "AADHAAR_REGEX" and not is_valid_aadhaar(val):
-                            continue
-                        if name == "CARD_REGEX" and not _luhn_valid(val):
-                            continue
-                        regex_hit = True
-                        regex_names.append(name)
-                        local["regex_counts"][name] += 1
+                gate = _ANY_PII_SEARCH(line)
+                if gate:
+                    # no pattern matches left of the gate's hit; lookbehinds
+                    # still see the text before pos
+                    pos = gate.start()
+                    shapes = {}  # prefilter -> found, checked on first use
+                    for name, rx in PII_PATTERNS.items():
+                        pre = PII_PREFILTERS.get(name)
+                        if pre is not None:
+                            found = shapes.get(pre)
+                            if found is None:
+                                found = shapes[pre] = pre(line, pos) is not None
+                            if not found:
+                                continue
+                        for m in rx.finditer(line, pos):
+                            val = m.group(0)
+                            if name == "AADHAAR_REGEX" and not is_valid_aadhaar(val):
+                                continue
+                            if name == "CARD_REGEX" and not _luhn_valid(val):
+                                continue
+                            regex_hit = True
+                            regex_names.append(name)
+                            local["regex_counts"][name] += 1
 
                 # --- Keyword matches ---
                 keyword_hit = False
-                for k, regs in KEYWORD_REGEXES.items():
-                    for rx in regs:
-                        if rx.search(line):
-                            keyword_hit = True
-                            local["keyword_counts"][k] += 1
+                gate = _ANY_KEYWORD_SEARCH(line)
+                if gate:
+                    pos = gate.start()
+                    lc = line.lower() if line.isascii() else None
+                    for k, regs in KEYWORD_REGEXES.items():
+                        for lead, rx in zip(KEYWORD_LEADS[k], regs):
+                            if (lc is None or lead in lc) and rx.search(line, pos):
+                                keyword_hit = True
+                                local["keyword_counts"][k] += 1
 
                 # --- Apply rules ---
                 if custid:
@@ -195,7 +279,7 @@ def process_file(file_path: str) -> dict:
                         local["custid_moved"] += 1
                         if mobile_only:
                             local["custid_mobile_only"] += 1
-                        local["custid_values"].append(custid)
+                        local["custid_values"].add(custid)
                 else:
                     if regex_hit or keyword_hit:
                         f_out.write(raw)
@@ -221,6 +305,25 @@ def process_file(file_path: str) -> dict:
         "error": local["error"],
     }
 
+def process_files(batch: list) -> list:
+    """Runs process_file over a batch of paths in one task (one IPC round-trip)."""
+    return [process_file(fp) for fp in batch]
+
+def iter_completed(ex, fn, tasks, max_in_flight: int):
+    """
+    Yields (task, future) as futures finish, keeping at most max_in_flight
+    submitted; a new task is submitted each time one completes.
+    """
+    tasks = iter(tasks)
+    futures = {ex.submit(fn, t): t for t in islice(tasks, max_in_flight)}
+    while futures:
+        done, _ = wait(futures, return_when=FIRST_COMPLETED)
+        for fut in done:
+            task = futures.pop(fut)
+            for nxt in islice(tasks, 1):
+                futures[ex.submit(fn, nxt)] = nxt
+            yield task, fut
+
 # ---------- Resume Log ----------
 def load_completed_set(log_path: str) -> set:
     completed = set()
@@ -232,10 +335,6 @@ def load_completed_set(log_path: str) -> set:
                     completed.add(name)
     return completed
 
-def append_completed(log_path: str, file_name: str):
-    with open(log_path, "a", encoding="utf-8") as f:
-        f.write(file_name + "\n")
-
 # ---------- Summary ----------
 def write_summary(summary):
     with open(SUMMARY_FILE, "w", encoding="utf-8") as f:
@@ -265,8 +364,8 @@ def write_summary(summary):
             f.write(f"  {k}: {v}\n")
 
         f.write("\n=== CustomerId Stats ===\n")
-        total_custids = len(summary["custid_values"])
-        unique_custids = len(set(summary["custid_values"]))
+        total_custids = summary["total_custid_moved"]
+        unique_custids = len(summary["custid_values"])
         dupes = total_custids - unique_custids
         f.write(f"Total moved CustomerIds: {total_custids}\n")
         f.write(f"Unique CustomerIds:      {unique_custids}\n")
@@ -286,12 +385,11 @@ def main():
     os.makedirs(OUTPUT_FOLDER, exist_ok=True)
     os.makedirs(CUSTID_FOLDER, exist_ok=True)
 
-    all_files = sorted(
-        os.path.join(INPUT_FOLDER, f)
-        for f in os.listdir(INPUT_FOLDER)
-        if os.path.isfile(os.path.join(INPUT_FOLDER, f))
-        and os.path.splitext(f)[1].lower() in ALLOWED_EXTS
-    )
+    with os.scandir(INPUT_FOLDER) as it:
+        all_files = sorted(
+            e.path for e in it
+            if e.is_file() and os.path.splitext(e.name)[1].lower() in ALLOWED_EXTS
+        )
 
     if not all_files:
         print(f"No {ALLOWED_EXTS} files found in INPUT_FOLDER.", file=sys.stderr)
@@ -315,24 +413,44 @@ def main():
         "custid_mobile_only": 0,
         "regex_counts": Counter(),
         "keyword_counts": Counter(),
-        "custid_values": [],
+        "custid_values": set(),
         "errors": [],
-        "custid_lines": []
     }
 
     overall_bar = tqdm(total=len(pending_files), desc="Overall", unit="file", leave=True)
     start_time = time.time()
+    custid_out = None  # opened on the first moved line
+    # One resume handle for the run, flushed once per finished batch
+    resume_fh = open(RESUME_LOG, "a", encoding="utf-8")
 
     try:
-        with ProcessPoolExecutor(max_workers=MAX_WORKERS) as ex:
-            futures = {ex.submit(process_file, fp): fp for fp in pending_files}
-            for fut in as_completed(futures):
-                file_path = futures[fut]
-                base_name = os.path.basename(file_path)
-
+        # fork: workers inherit the compiled patterns instead of re-importing
+        # this module. Linux only; others keep the default
+        ctx = mp.get_context("fork") if sys.platform.startswith("linux") else None
+        with ProcessPoolExecutor(max_workers=MAX_WORKERS, mp_context=ctx) as ex:
+            # Cap the batch so every worker still gets several tasks on small runs
+            per_task = max(1, min(FILES_PER_TASK, len(pending_files) // (MAX_WORKERS * 4)))
+            batches = (pending_files[i:i + per_task]
+                       for i in range(0, len(pending_files), per_task))
+
+            for batch, fut in iter_completed(ex, process_files, batches, MAX_IN_FLIGHT):
                 try:
-                    res = fut.result()
+                    batch_results = fut.result()
+                    batch_error = None
+                except Exception as e:
+                    batch_results = [None] * len(batch)
+                    batch_error = e
+
+                for file_path, res in zip(batch, batch_results):
+                    base_name = os.path.basename(file_path)
                     summary["files_scanned"] += 1
+
+                    if batch_error is not None:
+                        summary["files_error"] += 1
+                        summary["errors"].append(f"{base_name}: worker exception: {batch_error}")
+                        overall_bar.update(1)
+                        continue
+
                     summary["total_lines_processed"] += res["lines_processed"]
                     summary["total_lines_kept"] += res["lines_kept"]
                     summary["total_lines_removed"] += res["lines_removed"]
@@ -340,20 +458,22 @@ def main():
                     summary["custid_mobile_only"] += res["custid_mobile_only"]
                     summary["regex_counts"].update(Counter(res["regex_counts"]))
                     summary["keyword_counts"].update(Counter(res["keyword_counts"]))
-                    summary["custid_values"].extend(res["custid_values"])
-                    summary["custid_lines"].extend(res["custid_lines"])
+                    summary["custid_values"] |= res["custid_values"]
+                    # written as results arrive instead of held until the end
+                    if res["custid_lines"]:
+                        if custid_out is None:
+                            custid_out = open(os.path.join(CUSTID_FOLDER, "all_custid.txt"), "a", encoding="utf-8",
+                                          buffering=IO_BUFFER_SIZE)
+                        custid_out.writelines(res["custid_lines"])
 
                     if res["error"]:
                         summary["files_error"] += 1
                         summary["errors"].append(res["error"])
                     else:
                         summary["files_success"] += 1
-                        append_completed(RESUME_LOG, base_name)
-                except Exception as e:
-                    summary["files_scanned"] += 1
-                    summary["files_error"] += 1
-                    summary["errors"].append(f"{base_name}: worker exception: {e}")
-                overall_bar.update(1)
+                        resume_fh.write(base_name + "\n")
+                    overall_bar.update(1)
+                resume_fh.flush()
 
                 elapsed = time.time() - start_time
                 avg = elapsed / max(1, summary["files_scanned"])
@@ -363,9 +483,9 @@ def main():
 
     finally:
         overall_bar.close()
-        if summary["custid_lines"]:
-            with open(os.path.join(CUSTID_FOLDER, "all_custid.txt"), "a", encoding="utf-8") as custid_out:
-                custid_out.writelines(summary["custid_lines"])
+        resume_fh.close()
+        if custid_out is not None:
+            custid_out.close()
         write_summary(summary)
 
 if __name__ == "__main__":
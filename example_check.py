@@ -5,7 +5,7 @@ import os
 import random
 import traceback
 from collections import defaultdict
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from tqdm import tqdm
 
@@ -16,6 +16,7 @@ SUMMARY_FILE = "summary_report.txt"  # Saved in current working dir
 CHUNK_SIZE = 10000                   # Max lines per output file
 MAX_WORKERS = 6                      # Parallel workers
 ALLOWED_EXTS = (".txt",)             # Process only .txt files
+IO_BUFFER_SIZE = 1 << 20             # Bytes buffered per input file (default is 8 KiB)
 # ================================= #
 
 summary = {
@@ -36,22 +37,53 @@ def parse_line(line: str):
     log line ; path ; field ; regex type ; regex match
     Returns: (path, field, regex_type, regex_match)
     """
-    parts = [p.strip() for p in line.strip().split(";")]
+    # The log line itself may hold ';' too: split off only the last 4 fields
+    parts = line.strip().rsplit(";", 4)
     if len(parts) < 5:
         return None
-    regex_match = parts[-1]
-    regex_type = parts[-2]
-    field = parts[-3]
-    path = parts[-4]
+    regex_match = parts[-1].strip()
+    regex_type = parts[-2].strip()
+    field = parts[-3].strip()
+    path = parts[-4].strip()
     return path, field, regex_type, regex_match
 
+def add_example(by_path: dict, ex, first_key, fill_keys):
+    """
+    Record copies of example ex: first_key is their lowest shuffle key (None:
+    no update), fill_keys (sorted, may be empty) their lowest fill-order keys.
+    Per path keeps [first_key, first_ex, {ex: 2 lowest fill keys}], the fill
+    dict holding the 3 distinct examples with the lowest fill keys. A pick
+    takes one example per path plus at most 2 fill copies of other examples,
+    so that always suffices.
+    """
+    slot = by_path.get(ex[0])
+    if slot is None:
+        by_path[ex[0]] = slot = [first_key, ex, {}]
+    elif first_key is not None and first_key < slot[0]:
+        slot[0] = first_key
+        slot[1] = ex
+    if not fill_keys:
+        return
+    fill = slot[2]
+    have = fill.get(ex)
+    if have is not None:
+        fill[ex] = sorted(have + fill_keys)[:2]
+    elif len(fill) < 3:
+        fill[ex] = fill_keys[:2]
+    else:
+        worst = max(fill, key=lambda e: fill[e][0])
+        if fill_keys[0] < fill[worst][0]:
+            del fill[worst]
+            fill[ex] = fill_keys[:2]
+
 def process_file(file_path: Path) -> dict:
     local_counts = defaultdict(int)
-    local_examples = defaultdict(list)
+    local_examples = defaultdict(dict)  # field -> path -> sampled examples
+    rand = random.random
     local_stats = {"lines_in": 0, "errors": None}
 
     try:
-        with file_path.open("r", encoding="utf-8", errors="ignore") as fin:
+        with file_path.open("r", encoding="utf-8", errors="ignore", buffering=IO_BUFFER_SIZE) as fin:
             for line in fin:
                 if not line.strip():
                     continue
@@ -61,46 +93,45 @@ def process_file(file_path: Path) -> dict:
                     continue
                 path, field, regex_type, regex_match = parsed
                 local_counts[field] += 1
-                local_examples[field].append((path, field, regex_type, regex_match))
+                add_example(local_examples[field], (path, field, regex_type, regex_match), rand(), [rand()])
 
     except Exception as e:
         local_stats["errors"] = f"{file_path}: {e}"
 
     return {"counts": dict(local_counts), "examples": dict(local_examples), "stats": local_stats}
 
-def merge_results(results):
-    global_counts = defaultdict(int)
-    global_examples = defaultdict(list)
-
-    for result in results:
-        for field, cnt in result["counts"].items():
-            global_counts[field] += cnt
-        for field, exs in result["examples"].items():
-            global_examples[field].extend(exs)
-
-    return global_counts, global_examples
+def merge_result(result, global_counts, global_examples):
+    """
+    Fold one worker result in. Workers already keyed and sampled their
+    examples; each path's first and lowest fill keys are among the files' own.
+    """
+    for field, cnt in result["counts"].items():
+        global_counts[field] += cnt
+    for field, by_path in result["examples"].items():
+        into = global_examples[field]
+        for first_key, first_ex, fill in by_path.values():
+            add_example(into, first_ex, first_key, fill.get(first_ex, ()))
+            for ex, fill_keys in fill.items():
+                if ex != first_ex:
+                    add_example(into, ex, None, fill_keys)
 
 def select_examples(global_examples):
     chosen = {}
-    for field, exs in global_examples.items():
-        # Shuffle to randomize
-        random.shuffle(exs)
-
-        # Prefer unique paths
-        seen_paths = set()
-        picked = []
-        for ex in exs:
-            if ex[0] not in seen_paths:
-                picked.append(ex)
-                seen_paths.add(ex[0])
-            if len(picked) == 3:
-                break
-
-        # If fewer than 3 and still examples left, fill randomly
+    for field, by_path in global_examples.items():
+        # Prefer unique paths: each path's first example in shuffle order
+        # (lowest first key), earliest paths first
+        firsts = sorted((slot[0], slot[1]) for slot in by_path.values())
+        picked = [ex for _, ex in firsts[:3]]
+
+        # If fewer than 3 and still examples left, fill randomly: remaining
+        # copies (every copy of a picked example excluded) in fill-key order
         if len(picked) < 3:
-            remaining = [ex for ex in exs if ex not in picked]
-            random.shuffle(remaining)
-            picked.extend(remaining[: 3 - len(picked)])
+            remaining = sorted(
+                (key, ex) for slot in by_path.values()
+                for ex, fill_keys in slot[2].items() if ex not in picked
+                for key in fill_keys
+            )
+            picked.extend(ex for _, ex in remaining[: 3 - len(picked)])
 
         chosen[field] = picked
     return chosen
@@ -176,18 +207,19 @@ def main():
         print("No .txt files found in input folder.")
         return
 
-    results = []
+    global_counts = defaultdict(int)
+    global_examples = defaultdict(dict)  # field -> path -> sampled examples
+    # Files go to workers in chunks (one IPC round-trip per chunk)
+    chunksize = max(1, len(files) // (MAX_WORKERS * 4))
     with ProcessPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        futures = {executor.submit(process_file, f): f for f in files}
-        for future in tqdm(as_completed(futures), total=len(futures), desc="Processing files"):
-            result = future.result()
-            results.append(result)
+        results = executor.map(process_file, files, chunksize=chunksize)
+        for result in tqdm(results, total=len(files), desc="Processing files"):
+            merge_result(result, global_counts, global_examples)
             summary["files_scanned"] += 1
             summary["total_lines"] += result["stats"]["lines_in"]
             if result["stats"]["errors"]:
                 summary["errors"].append(result["stats"]["errors"])
 
-    global_counts, global_examples = merge_results(results)
     chosen_examples = select_examples(global_examples)
 
     lines_written, num_files = write_output(chosen_examples, global_counts)
@@ -45,10 +45,11 @@ def process_file(file_path: Path) -> dict:
                     continue
                 local_stats["lines_in"] += 1
 
-                parts = [p.strip() for p in line.split(";")]
-                if len(parts) >= 5:
+                # Only the last 4 fields matter: split off just those
+                parts = line.rsplit(";", 4)
+                if len(parts) == 5:
                     # Always take 3 fields: 4th, 3rd, 2nd from the right
-                    cleaned_parts = parts[-4:-1]
+                    cleaned_parts = [p.strip() for p in parts[1:4]]
                     cleaned = " ; ".join(cleaned_parts)
                     fout.write(cleaned + "\n")
                     local_stats["lines_out"] += 1
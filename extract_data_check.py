@@ -2,7 +2,7 @@
 import os
 import sys
 import traceback
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from tqdm import tqdm
 
@@ -12,6 +12,7 @@ OUTPUT_FOLDER = "cleaned_output"     # Folder for cleaned outputs
 SUMMARY_FILE = "summary_report.txt"  # Saved in current working dir
 MAX_WORKERS = 6                      # Parallel workers
 ALLOWED_EXTS = (".txt",)             # Process only .txt files
+IO_BUFFER_SIZE = 1 << 20             # Bytes buffered per input/output file (default is 8 KiB)
 # ================================= #
 
 summary = {
@@ -34,8 +35,8 @@ def process_file(file_path: Path) -> dict:
 
     try:
         output_path = Path(OUTPUT_FOLDER) / file_path.name
-        with file_path.open("r", encoding="utf-8", errors="ignore") as fin, \
-             output_path.open("w", encoding="utf-8") as fout:
+        with file_path.open("r", encoding="utf-8", errors="ignore", buffering=IO_BUFFER_SIZE) as fin, \
+             output_path.open("w", encoding="utf-8", buffering=IO_BUFFER_SIZE) as fout:
 
             for line in fin:
                 line = line.strip()
@@ -43,10 +44,11 @@ def process_file(file_path: Path) -> dict:
                     continue
                 local_stats["lines_in"] += 1
 
-                parts = [p.strip() for p in line.split(";")]
-                if len(parts) >= 5:
+                # Only the last 4 fields are used: split off just those
+                parts = line.rsplit(";", 4)
+                if len(parts) == 5:
                     # Keep last 4 fields from the right
-                    cleaned_parts = parts[-4:]
+                    cleaned_parts = [p.strip() for p in parts[1:]]
                     cleaned = " ; ".join(cleaned_parts)
                     fout.write(cleaned + "\n")
                     local_stats["lines_out"] += 1
@@ -84,10 +86,11 @@ def main():
         print("No .txt files found in input folder.")
         return
 
+    # Files go to workers in chunks (one IPC round-trip per chunk)
+    chunksize = max(1, len(files) // (MAX_WORKERS * 4))
     with ProcessPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        futures = {executor.submit(process_file, f): f for f in files}
-        for future in tqdm(as_completed(futures), total=len(futures), desc="Processing files"):
-            result = future.result()
+        results = executor.map(process_file, files, chunksize=chunksize)
+        for result in tqdm(results, total=len(files), desc="Processing files"):
             summary["files_scanned"] += 1
             summary["total_lines"] += result["lines_in"]
             summary["lines_written"] += result["lines_out"]
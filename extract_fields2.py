@@ -32,30 +32,37 @@ MOBILE_RE = re.compile(r'(?<![A-Za-z0-9])(?:91)?[6-9]\d{9}(?![A-Za-z0-9])')
 
 
 # ---------- field detection patterns ----------
-def make_patterns(mobile_escaped: str):
-    p_json_quoted = re.compile(
-        rf'["\']\s*(?P<field>[^"\']+?)\s*["\']\s*[:=]\s*["\']?(?P<mobile>{mobile_escaped})["\']?',
-        re.IGNORECASE,
-    )
-    p_kv = re.compile(
-        rf'\b(?P<field>[A-Za-z0-9_.\-]+)\s*[:=]\s*["\']?(?P<mobile>{mobile_escaped})["\']?',
-        re.IGNORECASE,
-    )
-    p_xml_attr = re.compile(
-        rf'<[^>]*\b(?P<field>[A-Za-z0-9_.\-]+)\s*=\s*["\'](?P<mobile>{mobile_escaped})["\'][^>]*>',
-        re.IGNORECASE | re.DOTALL,
-    )
-    p_xml_tag = re.compile(
-        rf'<\s*(?P<field>[A-Za-z0-9_.\-]+)[^>]*>[^<]*?(?P<mobile>{mobile_escaped})[^<]*?</\s*\1\s*>',
-        re.IGNORECASE | re.DOTALL,
-    )
-    return (p_json_quoted, p_kv, p_xml_attr, p_xml_tag)
+# Compiled once, not per mobile. The mobile goes in the subject instead of the
+# pattern: each is matched against mobile + "\0" + log_line, captures it ahead
+# of the NUL as "mob" and requires (?P=mob) where the literal used to be. The
+# lazy skip tries log_line positions left to right, so the hit (and its field)
+# is the one search() with the mobile inlined would have found.
+def _mobile_ref(body: str, flags: int):
+    return re.compile(r'(?P<mob>[^\x00]*)\x00[\s\S]*?' + body, flags)
+
+P_JSON_QUOTED = _mobile_ref(
+    r'["\']\s*(?P<field>[^"\']+?)\s*["\']\s*[:=]\s*["\']?(?P<mobile>(?P=mob))["\']?',
+    re.IGNORECASE,
+)
+P_KV = _mobile_ref(
+    r'\b(?P<field>[A-Za-z0-9_.\-]+)\s*[:=]\s*["\']?(?P<mobile>(?P=mob))["\']?',
+    re.IGNORECASE,
+)
+P_XML_ATTR = _mobile_ref(
+    r'<[^>]*\b(?P<field>[A-Za-z0-9_.\-]+)\s*=\s*["\'](?P<mobile>(?P=mob))["\'][^>]*>',
+    re.IGNORECASE | re.DOTALL,
+)
+P_XML_TAG = _mobile_ref(
+    r'<\s*(?P<field>[A-Za-z0-9_.\-]+)[^>]*>[^<]*?(?P<mobile>(?P=mob))[^<]*?</\s*(?P=field)\s*>',
+    re.IGNORECASE | re.DOTALL,
+)
+FIELD_PATTERNS = (P_JSON_QUOTED, P_KV, P_XML_ATTR, P_XML_TAG)
 
 
 def identify_field_for_mobile(log_line: str, mobile: str):
-    mob_esc = re.escape(mobile)
-    for pat in make_patterns(mob_esc):
-        m = pat.search(log_line)
+    subject = f"{mobile}\x00{log_line}"
+    for pat in FIELD_PATTERNS:
+        m = pat.match(subject)
         if m:
             field = m.group("field").strip()
             if field:
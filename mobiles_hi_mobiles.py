@@ -59,39 +59,52 @@ PII_PATTERNS = {
 }
 
 # ---------- Aadhaar Verhoeff ----------
+# Tables built once at import, not on every call
+_VERHOEFF_MUL = (
+    (0,1,2,3,4,5,6,7,8,9),
+    (1,2,3,4,0,6,7,8,9,5),
+    (2,3,4,0,1,7,8,9,5,6),
+    (3,4,0,1,2,8,9,5,6,7),
+    (4,0,1,2,3,9,5,6,7,8),
+    (5,9,8,7,6,0,4,3,2,1),
+    (6,5,9,8,7,1,0,4,3,2),
+    (7,6,5,9,8,2,1,0,4,3),
+    (8,7,6,5,9,3,2,1,0,4),
+    (9,8,7,6,5,4,3,2,1,0),
+)
+_VERHOEFF_PERM = (
+    (0,1,2,3,4,5,6,7,8,9),
+    (1,5,7,6,2,8,3,0,9,4),
+    (5,8,0,3,7,9,6,1,4,2),
+    (8,9,1,6,0,4,3,5,2,7),
+    (9,4,5,3,1,2,6,8,7,0),
+    (4,2,8,6,5,7,3,9,0,1),
+    (2,7,9,3,8,0,6,4,1,5),
+    (7,0,4,6,9,1,3,2,5,8),
+)
+_VERHOEFF_INV = (0,4,3,2,1,5,6,7,8,9)
+# perm row of each of the 12 digit positions, counted from the right
+_VERHOEFF_PERM_AT = tuple(_VERHOEFF_PERM[i % 8] for i in range(12))
+
 def is_valid_aadhaar(number: str) -> bool:
     if len(number) != 12 or not number.isdigit():
         return False
-    mul = [
-        [0,1,2,3,4,5,6,7,8,9],
-        [1,2,3,4,0,6,7,8,9,5],
-        [2,3,4,0,1,7,8,9,5,6],
-        [3,4,0,1,2,8,9,5,6,7],
-        [4,0,1,2,3,9,5,6,7,8],
-        [5,9,8,7,6,0,4,3,2,1],
-        [6,5,9,8,7,1,0,4,3,2],
-        [7,6,5,9,8,2,1,0,4,3],
-        [8,7,6,5,9,3,2,1,0,4],
-        [9,8,7,6,5,4,3,2,1,0]
-    ]
-    perm = [
-        [0,1,2,3,4,5,6,7,8,9],
-        [1,5,7,6,2,8,3,0,9,4],
-        [5,8,0,3,7,9,6,1,4,2],
-        [8,9,1,6,0,4,3,5,2,7],
-        [9,4,5,3,1,2,6,8,7,0],
-        [4,2,8,6,5,7,3,9,0,1],
-        [2,7,9,3,8,0,6,4,1,5],
-        [7,0,4,6,9,1,3,2,5,8]
-    ]
-    inv = [0,4,3,2,1,5,6,7,8,9]
+    mul = _VERHOEFF_MUL
     c = 0
-    for i, ch in enumerate(reversed(number)):
-        c = mul[c][perm[i % 8][int(ch)]]
-    return inv[c] == 0
+    for perm, ch in zip(_VERHOEFF_PERM_AT, reversed(number)):
+        c = mul[c][perm[int(ch)]]
+    return _VERHOEFF_INV[c] == 0
 
 # ---------- Card Luhn ----------
+# Luhn doubling of one ASCII digit (2d, less 9 past 9), digit to digit
+_LUHN_DOUBLE = bytes.maketrans(b"0123456789", b"0246813579")
+
 def luhn_valid(num: str) -> bool:
+    if num.isascii() and num.isdigit():
+        # digit sums in C: the rightmost digit and every other one as-is,
+        # the rest doubled through the table (48 = ord("0") per digit)
+        b = num.encode("ascii")
+        return (sum(b[-1::-2]) + sum(b[-2::-2].translate(_LUHN_DOUBLE)) - 48 * len(b)) % 10 == 0
     s, alt = 0, False
     for ch in reversed(num):
         if not ch.isdigit():
@@ -293,12 +306,11 @@ def main():
     os.makedirs(OUTPUT_MOBILE_ONLY, exist_ok=True)
 
     # Discover .txt files
-    all_files = sorted(
-        os.path.join(INPUT_FOLDER, f)
-        for f in os.listdir(INPUT_FOLDER)
-        if os.path.isfile(os.path.join(INPUT_FOLDER, f))
-        and os.path.splitext(f)[1].lower() in ALLOWED_EXTS
-    )
+    with os.scandir(INPUT_FOLDER) as it:
+        all_files = sorted(
+            e.path for e in it
+            if e.is_file() and os.path.splitext(e.name)[1].lower() in ALLOWED_EXTS
+        )
 
     if not all_files:
         print(f"No {ALLOWED_EXTS} files found in INPUT_FOLDER.", file=sys.stderr)
@@ -0,0 +1,75 @@
+import random
+from collections import defaultdict
+
+import pytest
+
+pytest.importorskip("tqdm")
+import example_check  # noqa: E402
+
+A = ("/p/one", "mobile", "MOBILE", "9876543210")
+B = ("/p/one", "mobile", "MOBILE", "9123456789")
+
+
+def run(files):
+    """Worker-sample each file's lines, merge, and select, as main() does."""
+    global_counts = defaultdict(int)
+    global_examples = defaultdict(dict)
+    for lines in files:
+        by_path = {}
+        for ex in lines:
+            example_check.add_example(by_path, ex, random.random(), [random.random()])
+        result = {"counts": {"mobile": len(lines)}, "examples": {"mobile": by_path}}
+        example_check.merge_result(result, global_counts, global_examples)
+    return example_check.select_examples(global_examples)["mobile"]
+
+
+def test_duplicate_examples_still_fill_three():
+    random.seed(1)
+    for _ in range(500):
+        lines = [A] * 50 + [B] * 50
+        random.shuffle(lines)
+        picked = run([lines])
+        # baseline: one pick, then 2 fill copies with every copy of the pick excluded
+        assert len(picked) == 3
+        assert set(picked) == {A, B}
+        assert picked.count(picked[0]) == 1
+
+
+def test_fill_stops_when_only_copies_of_the_pick_remain():
+    random.seed(2)
+    assert run([[A] * 40]) == [A]
+
+
+def test_process_file_dedups_before_capping(tmp_path):
+    random.seed(3)
+    src = tmp_path / "in.txt"
+    with src.open("w", encoding="utf-8") as f:
+        for ex in [A] * 20 + [B] * 20:
+            f.write("log line ; " + " ; ".join(ex) + "\n")
+    result = example_check.process_file(src)
+    assert result["counts"] == {"mobile": 40}
+    _, first_ex, fill = result["examples"]["mobile"]["/p/one"]
+    # one entry per distinct example, each with its 2 lowest fill keys
+    assert first_ex in (A, B)
+    assert sorted(fill) == [B, A] and all(len(keys) == 2 for keys in fill.values())
+
+
+def test_duplicates_split_across_worker_results():
+    random.seed(4)
+    for _ in range(500):
+        lines = [A] * 50 + [B] * 50
+        random.shuffle(lines)
+        picked = run([lines[:30], lines[30:70], lines[70:]])
+        assert len(picked) == 3
+        assert set(picked) == {A, B}
+        assert picked.count(picked[0]) == 1
+
+
+def test_each_copy_is_drawn_at_most_once():
+    random.seed(5)
+    others = [("/p/one", "mobile", "MOBILE", f"98765432{i:02d}") for i in range(5)]
+    for _ in range(500):
+        # all singletons: a merged pick never repeats an example
+        picked = run([[A] + others, [B]])
+        assert len(picked) == 3
+        assert len(set(picked)) == 3